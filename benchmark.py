@@ -0,0 +1,210 @@
+"""
+性能测试
+python benchmark.py extend <feed 文件>
+python benchmark.py parser [feed 文件...]  默认使用 fixtures 目录下的订阅
+python benchmark.py load [记录条数]
+python benchmark.py release [标题文件]  默认使用 fixtures/release_names.json
+"""
+
+import asyncio
+import glob
+import json
+import sys
+import time
+import tracemalloc
+
+import feedparser
+from loguru import logger
+
+from config import config
+import src.subscription  # 与 main.py 相同的加载顺序, 避免循环导入
+from src.database.adata import adata2record, record2adata
+from src.spider.routes.mikanani.mikanani_rss import (
+    MikananiRssSpiderAData,
+    get_torrent_url,
+)
+from src.spider.routes.rss.rss import RssSpider, RssSpiderAData
+from src.utils.feed import FEED_PARSERS, lxml_etree
+from src.utils.release_name import parse_release_name
+from src.utils.serialize import dumps, loads
+
+
+def extend_projection_benchmark(path: str, rounds: int = 20):
+    """
+    对比 extend 保存完整 entry 和按 extend_fields 裁剪后的存储大小、读取耗时
+    """
+    with open(path, "rb") as f:
+        d = feedparser.parse(f.read())
+    spider = RssSpider()
+
+    def records(project: bool) -> str:
+        result = []
+        for entry in d["entries"]:
+            adata = RssSpiderAData(
+                id=spider.get_only_id(entry.get("link", entry.get("title"))),
+                title=entry.get("title"),
+                content=entry.get("summary"),
+                url=entry.get("link"),
+                extend=spider.project_extend(entry) if project else entry,
+            )
+            record = dict(adata.__dict__)
+            record["__type__"] = adata.__class__.__name__
+            result.append(record)
+        return json.dumps(result, ensure_ascii=False, default=list)
+
+    for name, project in (("完整 entry", False), ("extend_fields", True)):
+        data = records(project)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for record in json.loads(data):
+                RssSpiderAData(**record)
+        cost = (time.perf_counter() - start) / rounds * 1000
+        logger.info(
+            f"{name}: {len(d['entries'])} 条, {len(data.encode('utf-8'))} bytes, "
+            f"读取 {cost:.2f} ms"
+        )
+
+
+def entry_summary(entry: dict) -> dict:
+    """
+    spider 实际使用的字段, 用于和 feedparser 对比
+    """
+    return {
+        "id": entry.get("link", entry.get("title")),
+        "title": entry.get("title"),
+        "link": entry.get("link"),
+        "summary": entry.get("summary"),
+        "published": entry.get("published", entry.get("updated")),
+        "author": entry.get("author"),
+        "tags": [tag.get("term") for tag in entry.get("tags", [])],
+        "contentlength": entry.get("contentlength"),
+        "torrent_url": get_torrent_url(entry),
+    }
+
+
+def parser_benchmark(paths: list, rounds: int = 20):
+    """
+    对比各解析引擎的解析耗时、内存峰值, 以及与 feedparser 的结果是否一致
+    """
+    engines = [
+        name for name in FEED_PARSERS if name != "lxml" or lxml_etree is not None
+    ]
+    for path in paths:
+        with open(path, "rb") as f:
+            content = f.read()
+        expected_feed, expected = FEED_PARSERS["feedparser"](content)
+        for engine in engines:
+            parse = FEED_PARSERS[engine]
+            start = time.perf_counter()
+            for _ in range(rounds):
+                parse(content)
+            cost = (time.perf_counter() - start) / rounds * 1000
+            tracemalloc.start()
+            feed, entries = parse(content)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            mismatches = []
+            if feed.get("title") != expected_feed.get("title"):
+                mismatches.append("feed.title")
+            if len(entries) != len(expected):
+                mismatches.append(f"条目数 {len(entries)} != {len(expected)}")
+            for i, (a, b) in enumerate(zip(expected, entries)):
+                a, b = entry_summary(a), entry_summary(b)
+                mismatches.extend(
+                    f"#{i}.{key}: {a[key]!r} != {b[key]!r}"
+                    for key in a
+                    if a[key] != b[key]
+                )
+            logger.info(
+                f"{path} [{engine}]: {len(entries)} 条, 解析 {cost:.2f} ms, "
+                f"内存峰值 {peak / 1024:.0f} KB, 不一致 {len(mismatches)} 处"
+            )
+            for mismatch in mismatches[:5]:
+                logger.warning(f"  {mismatch[:200]}")
+
+
+def load_benchmark(count: int = 10000, rounds: int = 5):
+    """
+    对比读取历史数据时, 带结构版本的记录 (跳过校验) 和旧记录 (完整校验) 的耗时
+    """
+    records = []
+    for i in range(count):
+        adata = MikananiRssSpiderAData(
+            id=f"MikananiRssSpider_https://mikanani.me/Home/Episode/{i:040x}",
+            title=f"[ANi] 番剧 {i} - 01 [1080P][Baha][WEB-DL][AAC AVC][CHT][MP4]",
+            content=f"[ANi] 番剧 {i} - 01 [1080P][Baha][WEB-DL][AAC AVC][CHT][MP4]",
+            url=f"https://mikanani.me/Home/Episode/{i:040x}",
+            source="Mikan Project - 最新",
+            push_time=1720192140000 + i,
+            extend={"id": str(i)},
+            torrent_url=f"https://mikanani.me/Download/20240705/{i:040x}.torrent",
+            content_length=i * 1024,
+            magnet_url=f"magnet:?xt=urn:btih:{i:040x}",
+        )
+        records.append(adata2record(adata))
+    legacy = [
+        {key: value for key, value in record.items() if key != "__version__"}
+        for record in records
+    ]
+    for name, data in (("完整校验", dumps(legacy)), ("跳过校验", dumps(records))):
+        decode_cost = build_cost = 0.0
+        for _ in range(rounds):
+            start = time.perf_counter()
+            items = loads(data)
+            decode_cost += time.perf_counter() - start
+            start = time.perf_counter()
+            for record in items:
+                record2adata(record)
+            build_cost += time.perf_counter() - start
+        logger.info(
+            f"{name}: {count} 条, json 解析 {decode_cost / rounds * 1000:.2f} ms, "
+            f"构建 AData {build_cost / rounds * 1000:.2f} ms"
+        )
+
+
+def release_name_benchmark(path: str = "fixtures/release_names.json", rounds=1000):
+    """
+    本地解析番剧标题的耗时、各字段准确率, 以及置信度达到阈值 (不再请求 chatgpt) 的比例
+    """
+    with open(path, "rb") as f:
+        cases = loads(f.read())
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for case in cases:
+            parse_release_name(case["title"])
+    cost = (time.perf_counter() - start) / rounds / len(cases) * 1000 * 1000
+    correct = {key: 0 for key in cases[0]["expected"]}
+    confident = confident_wrong = 0
+    for case in cases:
+        result = parse_release_name(case["title"]).model_dump()
+        wrong = [key for key, value in case["expected"].items() if result[key] != value]
+        for key in case["expected"]:
+            correct[key] += key not in wrong
+        if result["confidence"] >= config.release_name_min_confidence:
+            confident += 1
+            if "cn" in wrong or "jp" in wrong:
+                confident_wrong += 1
+                logger.warning(f"  {case['title']}: {[result[key] for key in wrong]}")
+    logger.info(f"{path}: {len(cases)} 条, 每条解析 {cost:.1f} us")
+    logger.info(
+        "准确率: "
+        + ", ".join(f"{key} {count}/{len(cases)}" for key, count in correct.items())
+    )
+    logger.info(
+        f"置信度 >= {config.release_name_min_confidence}: {confident}/{len(cases)} 条"
+        f" 不请求 chatgpt, 其中名称错误 {confident_wrong} 条"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "extend":
+        extend_projection_benchmark(sys.argv[2])
+    elif len(sys.argv) >= 2 and sys.argv[1] == "parser":
+        parser_benchmark(sys.argv[2:] or sorted(glob.glob("fixtures/*.xml")))
+    elif len(sys.argv) >= 2 and sys.argv[1] == "load":
+        load_benchmark(*(int(arg) for arg in sys.argv[2:3]))
+    elif len(sys.argv) >= 2 and sys.argv[1] == "release":
+        release_name_benchmark(*sys.argv[2:3])
+    else:
+        print(__doc__)
+        exit(1)
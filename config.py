@@ -58,6 +58,128 @@ class Config(BaseSettings):
     """
     gpt_model: str = "gpt-3.5-turbo"
     gpt_host: str = "api.openai.com"
+    gpt_batch_size: int = 20
+    """
+    单次请求最多识别的标题数量
+    """
+    gpt_batch_max_tokens: int = 2000
+    """
+    单次请求中标题的估算 token 数上限
+    """
+    gpt_concurrency: int = 2
+    """
+    同时进行的 chatgpt 请求数量
+    """
+    release_name_min_confidence: float = 0.8
+    """
+    本地解析番剧标题的置信度阈值, 低于阈值时使用 chatgpt 识别, 设为大于 1 时总是使用 chatgpt
+    """
+
+    pic_cache_max_size: int = 200
+    """
+    图片磁盘缓存大小上限, 单位 MB, 超过后淘汰最久未使用的图片, 0 为不缓存
+    """
+    telegram_upload_cache_ttl: float = 3600
+    """
+    已上传到 Telegram 的图片复用时间, 单位秒, 有效期内相同图片不再上传, 0 为不复用
+    """
+
+    http_max_connections: int = 100
+    """
+    共享 http 客户端最大连接数
+    """
+    http_max_keepalive_connections: int = 20
+    """
+    共享 http 客户端最大保持连接数
+    """
+    http_keepalive_expiry: float = 30
+    """
+    空闲连接保持时间, 单位秒
+    """
+    http2: bool = True
+    """
+    是否启用 HTTP/2, 需要安装 h2
+    """
+    http_cache_ttl: float = 0
+    """
+    订阅抓取的响应缓存时间, 单位秒, 相同的请求在此时间内直接使用缓存, 0 为不缓存
+    同时进行的相同订阅抓取总是只发送一次, 图片、种子等下载不缓存
+    """
+
+    fetch_concurrency: int = 10
+    """
+    同时抓取的订阅数量上限
+    """
+    fetch_per_host_concurrency: int = 2
+    """
+    同一域名同时抓取的订阅数量上限
+    """
+    fetch_jitter: int = 10
+    """
+    定时任务随机延后的最大秒数, 避免相同 cron 的订阅同时触发
+    """
+    fetch_start_spread: int = 60
+    """
+    启动时首次抓取分散在多少秒内
+    """
+
+    adaptive_max_factor: int = 12
+    """
+    自适应抓取时, 最长间隔为 cron 间隔的倍数
+    """
+
+    action_workers: int = 4
+    """
+    同时执行的 Action 数量
+    """
+    action_queue_size: int = 100
+    """
+    Action 队列长度, 队列满时订阅任务等待
+    """
+    action_timeout: float = 300
+    """
+    单个 Action 执行超时时间, 单位秒
+    """
+
+    outbox_batch_size: int = 50
+    """
+    发件箱每批投递的数据条数
+    """
+    outbox_retry_base: float = 30
+    """
+    发件箱重试间隔, 单位秒, 每次失败翻倍
+    """
+    outbox_retry_max: float = 3600
+    """
+    发件箱最长重试间隔, 单位秒
+    """
+    outbox_max_attempts: int = 10
+    """
+    发件箱最多投递次数, 超过后丢弃
+    """
+    outbox_cron: str = "30 * * * * *"
+    """
+    重新投递发件箱中失败记录的时间
+    """
+
+    adata_storage: str = "sqlite"
+    """
+    数据存储后端: sqlite or json
+    """
+
+    retention_cron: str = "0 0 4 * * *"
+    """
+    按订阅保留策略压缩历史数据的时间
+    """
+
+    seen_index_bloom_threshold: int = 0
+    """
+    已读 id 数量超过该值时压缩进布隆过滤器, 0 为不压缩
+    """
+    seen_index_bloom_error_rate: float = 0.0001
+    """
+    布隆过滤器误判率, 误判的新数据会被当作已读跳过
+    """
 
 
 config = Config()
@@ -2,15 +2,36 @@ from config import config
 from src.bot import start_telegram_bot
 from src.subscription import start_subscription
 from src.web import start_web
+from src.utils.request import close_clients
+from src.database.backend import close_storage
+from src.database.outbox import outbox
+from src.subscription.dispatch import dispatcher
+from src.utils.gpt_tools import bangumi_name_cache
+from src.utils.pic_cache import pic_cache
 import asyncio
 from loguru import logger
 
 
 async def background_task():
-    await asyncio.gather(
-        start_telegram_bot(asyncio.get_event_loop(), "ABot Started"),
-        start_subscription(),
-    )
+    try:
+        await asyncio.gather(
+            start_telegram_bot(asyncio.get_event_loop(), "ABot Started"),
+            start_subscription(),
+        )
+    finally:
+        await shutdown()
+
+
+async def shutdown():
+    """
+    退出前清理资源
+    """
+    await dispatcher.stop()
+    await close_clients()
+    await close_storage()
+    await outbox.close()
+    await bangumi_name_cache.close()
+    await pic_cache.close()
 
 
 if __name__ == "__main__":
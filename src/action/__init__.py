@@ -7,6 +7,8 @@
 import os
 from typing import List
 
+from src.utils.static_config import get_static_config
+
 
 ACTIONS = {}
 
@@ -34,6 +36,6 @@ def create_actions(data: List[dict]):
     actions = []
     for d in data:
         action = ACTIONS[d["name"]](**d)
-        action.static_config = action.static_config.__class__()
+        action.static_config = get_static_config(action.static_config.__class__)
         actions.append(action)
     return actions
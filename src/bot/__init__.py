@@ -3,7 +3,9 @@
 """
 
 import asyncio
-from typing import Any, List, Literal, Optional, Tuple
+import hashlib
+import time
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
 from loguru import logger
 from telethon import TelegramClient
@@ -21,6 +23,12 @@ if config.proxy:
 
 bot: Optional[TelegramClient] = None
 
+# 已上传的文件, {sha256: (上传时间, InputFile)}, 相同内容的文件再次发送时不再上传
+UPLOADED_FILES: Dict[str, Tuple[float, Any]] = {}
+
+# 正在上传的文件, 相同内容同时上传时只上传一次
+UPLOADING: Dict[str, asyncio.Task] = {}
+
 
 def get_bot() -> TelegramClient:
     """
@@ -31,15 +39,37 @@ def get_bot() -> TelegramClient:
     return bot
 
 
+def _on_upload_done(digest: str, task: asyncio.Task) -> None:
+    UPLOADING.pop(digest, None)
+    if task.cancelled() or task.exception() is not None:
+        return
+    now = time.monotonic()
+    ttl = config.telegram_upload_cache_ttl
+    for expired in [k for k, (t, _) in UPLOADED_FILES.items() if now - t >= ttl]:
+        del UPLOADED_FILES[expired]
+    UPLOADED_FILES[digest] = (now, task.result())
+
+
+async def upload_file(file: bytes) -> Any:
+    """
+    上传文件, 有效期内相同内容的文件使用之前上传的 InputFile
+    """
+    digest = hashlib.sha256(file).hexdigest()
+    uploaded = UPLOADED_FILES.get(digest)
+    if uploaded and time.monotonic() - uploaded[0] < config.telegram_upload_cache_ttl:
+        return uploaded[1]
+    task = UPLOADING.get(digest)
+    if task is None:
+        task = UPLOADING[digest] = asyncio.ensure_future(get_bot().upload_file(file))
+        task.add_done_callback(lambda t: _on_upload_done(digest, t))
+    return await asyncio.shield(task)
+
+
 async def telegram_upload_file(files: List[bytes]) -> List[Any]:
     """
     上传文件，返回文件id
     """
-    bot = get_bot()
-    tasks = []
-    for file in files:
-        tasks.append(bot.upload_file(file))
-    return await asyncio.gather(*tasks)
+    return await asyncio.gather(*(upload_file(file) for file in files))
 
 
 async def start_telegram_bot(loop: Any, boot_message: str) -> None:
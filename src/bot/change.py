@@ -6,6 +6,7 @@ from src.bot.inputs import (
     choose_actions,
     choose_spider,
     cron_input,
+    retention_input,
     subscription_name_input,
     url_input,
 )
@@ -22,7 +23,7 @@ from src.bot.lib import (
     InputText,
 )
 from src.bot.utils import subscription_telegram_message_text
-from src.database import load_subscriptions, update_subscription
+from src.database import get_subscription, load_subscriptions, update_subscription
 from src.models import Subscription
 from src.spider import get_spider_support_actions_by_name
 
@@ -45,6 +46,7 @@ async def change_filed(
             InputButton("白名单关键词", data="white_keywords"),
             InputButton("黑名单关键词", data="black_keywords"),
             InputButton("Actions", data="actions"),
+            InputButton("保留策略", data="retention"),
             (
                 InputButton("停止", data="enable")
                 if sub.enable
@@ -55,6 +57,11 @@ async def change_filed(
                 if sub.enable_proxy
                 else InputButton("开启代理", data="enable_proxy")
             ),
+            (
+                InputButton("固定频率", data="adaptive")
+                if sub.adaptive
+                else InputButton("自适应频率", data="adaptive")
+            ),
             InputButtonCancel(),
             InputButtonConfirm(),
         ]
@@ -82,10 +89,14 @@ async def change_filed(
                     support_actions=get_spider_support_actions_by_name(sub.spider.name),
                     actions_select=sub.actions,
                 )
+            elif btn == "retention":
+                sub.retention = await retention_input(bot, event, sub.retention)
             elif btn == "enable":
                 sub.enable = not sub.enable
             elif btn == "enable_proxy":
                 sub.enable_proxy = not sub.enable_proxy
+            elif btn == "adaptive":
+                sub.adaptive = not sub.adaptive
             elif btn == "white_keywords":
                 sub.white_keywords = await InputListStr(
                     bot,
@@ -131,6 +142,7 @@ async def change_list(
         btn = await InputBtns(bot, event, "选择要修改的订阅", btns).input()
         if btn == CANCEL:
             return
-        sub = next((sub for sub in subs if sub.name == btn), None)
+        sub = await get_subscription(btn)
         if sub:
-            await change_filed(bot, event, sub)
+            # 修改副本, 确认后再替换, 取消时不影响正在运行的订阅
+            await change_filed(bot, event, sub.model_copy(deep=True))
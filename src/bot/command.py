@@ -19,6 +19,7 @@ from config import config
 from src.database import add_subscription, load_subscriptions
 from src.models import Subscription
 from src.spider import get_spider_support_actions_by_name
+from src.utils.static_config import reload_static_configs
 
 
 class StratCommands:
@@ -40,6 +41,15 @@ async def start(event: events.NewMessage.Event) -> None:
     await event.reply(text)
 
 
+@bot.on(events.NewMessage(pattern="/reload", from_users=config.telegram_admin_ids))  # type: ignore
+async def reload(event: events.NewMessage.Event) -> None:
+    """
+    重新读取 Spider / Action 的静态配置
+    """
+    count = reload_static_configs()
+    await event.reply(f"已重新读取静态配置: {count} 个")
+
+
 @bot.on(events.NewMessage(pattern="/start", from_users=config.telegram_admin_ids))  # type: ignore
 async def start(event: events.NewMessage.Event) -> None:
     btns = []
@@ -14,7 +14,9 @@ from src.bot.lib import (
     InputButtonConfirm,
     InputListStr,
     InputText,
+    InputTextInt,
 )
+from src.models import RetentionPolicy
 from src.spider import get_all_spider
 from src.utils import create_trigger
 
@@ -84,6 +86,37 @@ async def cron_input(
     return sub_cron
 
 
+async def retention_input(
+    bot: TelegramClient,
+    event: events.CallbackQuery.Event,
+    retention: RetentionPolicy,
+) -> RetentionPolicy:
+    """
+    历史数据保留策略输入, 0 为不限制
+    """
+    max_items = await InputTextInt(
+        bot,
+        event,
+        f"最多保留多少条完整数据, 0 为不限制\n当前: `{retention.max_items or 0}`",
+    ).input()
+    max_days = await InputTextInt(
+        bot,
+        event,
+        f"数据保留多少天, 超出且订阅源不再返回的连同 id 删除, 0 为不限制\n"
+        f"当前: `{retention.max_days or 0}`",
+    ).input()
+    ids_only_days = await InputTextInt(
+        bot,
+        event,
+        f"超过多少天的数据只保留 id, 0 为不限制\n当前: `{retention.ids_only_days or 0}`",
+    ).input()
+    return RetentionPolicy(
+        max_items=max_items or None,
+        max_days=max_days or None,
+        ids_only_days=ids_only_days or None,
+    )
+
+
 async def action_config_input(
     bot: TelegramClient,
     event: events.CallbackQuery.Event,
@@ -9,6 +9,7 @@ async def subscription_telegram_message_text(subscription: Subscription) -> str:
     text = f"Sub: `{subscription.name}`{' - *已停止*' if not subscription.enable else ''}\n"
     text += f"Cron: `{subscription.cron}`\n"
     text += f"Proxy: {'开启' if subscription.enable_proxy else '关闭'}\n"
+    text += f"自适应频率: {'开启' if subscription.adaptive else '关闭'}\n"
     text += (
         f"Spider: { subscription.spider.description if subscription.spider else '无'}\n"
     )
@@ -27,6 +28,17 @@ async def subscription_telegram_message_text(subscription: Subscription) -> str:
         text += "\n".join([f"  - {k}" for k in subscription.black_keywords])
         text += "\n\n"
 
+    # 保留策略
+    if not subscription.retention.is_empty():
+        text += f"保留策略:\n"
+        if subscription.retention.max_items:
+            text += f"  - 最多 {subscription.retention.max_items} 条\n"
+        if subscription.retention.max_days:
+            text += f"  - 数据保留 {subscription.retention.max_days} 天\n"
+        if subscription.retention.ids_only_days:
+            text += f"  - {subscription.retention.ids_only_days} 天后只保留 id\n"
+        text += "\n"
+
     text += f"Actions:\n"
     for action in subscription.actions:
         action_text = f"{action.description} - {action.name}\n"
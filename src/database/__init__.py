@@ -3,16 +3,22 @@
 去重复、数据存储
 """
 
-from typing import Any, Dict, List
+import asyncio
+from typing import Any, Dict, List, Optional
 from src.action import create_actions
 from src.models import AData, Subscription
 from config import config
-import json
+from loguru import logger
 import aiofiles
 
 
 import os
 from src.spider import create_spider
+from src.database.outbox import outbox
+from src.database.seen import drop_seen_index
+from src.utils.atomic import atomic_write, backup_path
+from src.utils.serialize import dumps, loads
+from src.utils.static_config import get_static_config
 
 
 from src.subscription.scheduler import (
@@ -31,52 +37,133 @@ subscription_path = f"{config.data_path}/config"
 if not os.path.exists(subscription_path):
     os.makedirs(subscription_path)
 
+# 内存中的订阅, {名称: 订阅}, 第一次使用时从 config.json 读取, 修改时同步写入文件
+SUBSCRIPTIONS: Dict[str, Subscription] = {}
+
+# 读取失败的订阅的原始配置, 保存时原样写回, 避免 spider / action 暂时无法加载时丢失订阅
+UNLOADED_SUBSCRIPTIONS: List[dict] = []
+
+_subscriptions_loaded = False
+
+_subscriptions_lock: Optional[asyncio.Lock] = None
+
+
+def get_subscriptions_lock() -> asyncio.Lock:
+    """
+    订阅读写锁, 在协程中第一次使用时创建
+    python 3.10 之前 asyncio.Lock 在创建时绑定当前事件循环, 不能在导入时创建
+    """
+    global _subscriptions_lock
+    if _subscriptions_lock is None:
+        _subscriptions_lock = asyncio.Lock()
+    return _subscriptions_lock
+
 
 async def save_subscriptions(subscriptions: List[Subscription]):
     """
-    保存订阅配置
-    """
-    async with aiofiles.open(
-        f"{subscription_path}/config.json", "w", encoding="utf-8"
-    ) as f:
-        datas = []
-        for subscription in subscriptions:
-            # 将对象转换为 json
-            data = subscription.model_dump()
-            # 去掉 spider 和 actions 的 static_config 字段
-            del data["spider"]["static_config"]
-            for action in data["actions"]:
-                del action["static_config"]
-            datas.append(data)
-        await f.write(
-            json.dumps(
-                datas,
-                indent=4,
-                ensure_ascii=False,
+    保存订阅配置, 原子写入, 旧文件保留为 config.json.bak
+    """
+    datas = []
+    for subscription in subscriptions:
+        # 将对象转换为 json
+        data = subscription.model_dump()
+        # 去掉 spider 和 actions 的 static_config 字段
+        del data["spider"]["static_config"]
+        for action in data["actions"]:
+            del action["static_config"]
+        datas.append(data)
+    names = {data["name"] for data in datas}
+    # 同名的订阅已重新添加时不再写回
+    datas.extend(data for data in UNLOADED_SUBSCRIPTIONS if data.get("name") not in names)
+    await atomic_write(
+        f"{subscription_path}/config.json", dumps(datas, pretty=True), backup=True
+    )
+
+
+async def read_subscription_file(path: str) -> Optional[List[dict]]:
+    """
+    读取订阅配置文件, 文件不存在时返回 None
+    """
+    if not os.path.isfile(path):
+        return None
+    async with aiofiles.open(path, "r", encoding="utf-8") as f:
+        return loads(await f.read())
+
+
+async def read_subscriptions() -> List[Subscription]:
+    """
+    从 config.json 读取订阅配置
+    文件损坏时读取备份, 备份也无法读取时抛出异常, 避免之后保存时覆盖原有订阅
+    """
+    path = f"{subscription_path}/config.json"
+    try:
+        subscriptions = await read_subscription_file(path)
+    except Exception as e:
+        logger.error(f"订阅配置读取失败: {path}, {e}, 尝试读取备份")
+        try:
+            subscriptions = await read_subscription_file(backup_path(path))
+        except Exception as backup_error:
+            logger.error(f"订阅配置备份读取失败: {backup_error}")
+            subscriptions = None
+        if subscriptions is None:
+            raise Exception(f"订阅配置损坏, 请检查: {path}") from e
+    if subscriptions is None:
+        subscriptions = await read_subscription_file(backup_path(path)) or []
+
+    result = []
+    UNLOADED_SUBSCRIPTIONS.clear()
+    for subscription in subscriptions:
+        try:
+            data = dict(subscription)
+            data["spider"] = create_spider(data["spider"])
+            if data["spider"] is None:
+                raise Exception(f"未知的 spider: {subscription['spider'].get('name')}")
+            data["actions"] = create_actions(data.get("actions", []))
+            result.append(Subscription(**data))
+        except Exception as e:
+            logger.error(
+                f"订阅读取失败, 跳过, 保存时原样保留: {subscription.get('name')}, {e}"
             )
-        )
+            UNLOADED_SUBSCRIPTIONS.append(subscription)
+    return result
+
+
+async def ensure_subscriptions_loaded() -> None:
+    global _subscriptions_loaded
+    if _subscriptions_loaded:
+        return
+    async with get_subscriptions_lock():
+        if not _subscriptions_loaded:
+            for subscription in await read_subscriptions():
+                SUBSCRIPTIONS[subscription.name] = subscription
+            _subscriptions_loaded = True
 
 
 async def load_subscriptions() -> List[Subscription]:
     """
-    读取订阅配置
+    读取订阅配置, 返回内存中的订阅
+    返回的订阅与定时任务共用, 需要修改时先复制
     """
-    result = []
-    try:
-        async with aiofiles.open(
-            f"{subscription_path}/config.json", "r", encoding="utf-8"
-        ) as f:
-            subscriptions = json.loads(await f.read())
-            for subscription in subscriptions:
-                subscription["spider"] = create_spider(subscription["spider"])
-                subscription["actions"] = create_actions(
-                    subscription.get("actions", [])
-                )
-
-                result.append(Subscription(**subscription))
-            return result
-    except Exception:
-        return []
+    await ensure_subscriptions_loaded()
+    return list(SUBSCRIPTIONS.values())
+
+
+async def get_subscription(name: str) -> Optional[Subscription]:
+    """
+    按名称获取订阅
+    """
+    await ensure_subscriptions_loaded()
+    return SUBSCRIPTIONS.get(name)
+
+
+def share_static_configs(subscription: Subscription) -> None:
+    """
+    使用共用的静态配置, 通过 Telegram 新建的 spider / action 使用的是默认配置的副本
+    """
+    spider = subscription.spider
+    spider.static_config = get_static_config(spider.static_config.__class__)
+    for action in subscription.actions:
+        action.static_config = get_static_config(action.static_config.__class__)
 
 
 @add_sub_async_decorator
@@ -84,9 +171,11 @@ async def add_subscription(subscription: Subscription):
     """
     添加订阅
     """
-    subscriptions = await load_subscriptions()
-    subscriptions.append(subscription)
-    await save_subscriptions(subscriptions)
+    share_static_configs(subscription)
+    await ensure_subscriptions_loaded()
+    async with get_subscriptions_lock():
+        SUBSCRIPTIONS[subscription.name] = subscription
+        await save_subscriptions(list(SUBSCRIPTIONS.values()))
 
 
 @update_job_async_decorator
@@ -94,14 +183,20 @@ async def update_subscription(
     old_subscription: Subscription, subscription: Subscription
 ):
     """
-    更新订阅
+    更新订阅, 名称变化时保持原来的顺序
     """
-    subscriptions = await load_subscriptions()
-    for index, sub in enumerate(subscriptions):
-        if sub.name == old_subscription.name:
-            subscriptions[index] = subscription
-            break
-    await save_subscriptions(subscriptions)
+    share_static_configs(subscription)
+    await ensure_subscriptions_loaded()
+    async with get_subscriptions_lock():
+        subscriptions = {
+            (subscription.name if name == old_subscription.name else name): (
+                subscription if name == old_subscription.name else sub
+            )
+            for name, sub in SUBSCRIPTIONS.items()
+        }
+        SUBSCRIPTIONS.clear()
+        SUBSCRIPTIONS.update(subscriptions)
+        await save_subscriptions(list(SUBSCRIPTIONS.values()))
 
 
 @remove_job_async_decorator
@@ -109,9 +204,9 @@ async def delete_subscription(subscription: Subscription):
     """
     删除订阅
     """
-    subscriptions = await load_subscriptions()
-    for index, sub in enumerate(subscriptions):
-        if sub.name == subscription.name:
-            subscriptions.pop(index)
-            break
-    await save_subscriptions(subscriptions)
+    await ensure_subscriptions_loaded()
+    async with get_subscriptions_lock():
+        SUBSCRIPTIONS.pop(subscription.name, None)
+        await save_subscriptions(list(SUBSCRIPTIONS.values()))
+    drop_seen_index(subscription.name)
+    await outbox.drop_subscription(subscription.name)
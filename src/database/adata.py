@@ -1,32 +1,54 @@
-from typing import List
+from typing import List, Type
 from src.models import AData, Subscription
-from config import config
-import json
-import aiofiles
 from src.spider import ADATA_CLASS
+from src.utils import get_timestamp
+from src.database.backend import IDS_ONLY_KEY, get_storage
+from src.database.seen import add_seen_ids
 
 
-async def save_adatas(adatas: List[AData], subscription: Subscription):
+# 存储记录的结构版本, AData 字段类型变化时需要加 1, 旧版本的记录读取时重新校验
+ADATA_SCHEMA_VERSION = 1
+
+
+def adata2record(adata: AData) -> dict:
+    """
+    AData 转换为存储记录, 并将对象类型写入 __type__ 字段, 结构版本写入 __version__ 字段
     """
-    保存数据, 暂时存json
+    record = dict(adata.__dict__)
+    record["__type__"] = adata.__class__.__name__
+    record["__version__"] = ADATA_SCHEMA_VERSION
+    return record
+
+
+def construct_adata(adata_class: Type[AData], record: dict) -> AData:
     """
-    # 读取数据
-    old_adatas = await load_adatas(subscription)
-    # 合并数据
-    old_adatas.extend(adatas)
-    # 去重复
-    old_adatas = list({adata.id: adata for adata in old_adatas}.values())
+    跳过校验构建 AData, 只用于自己写入的记录
+    """
+    values = dict(record)
+    values.pop("__type__", None)
+    values.pop("__version__", None)
+    return adata_class.model_construct(**values)
+
 
-    async with aiofiles.open(
-        f"{config.data_path}/{subscription.name}.json", "w", encoding="utf-8"
-    ) as f:
-        # 写入的时候，将对象转换为dict，并将对象类型写入 __type__ 字段
-        json_data = []
-        for adata in old_adatas:
-            adata_dict = adata.__dict__
-            adata_dict["__type__"] = adata.__class__.__name__
-            json_data.append(adata_dict)
-        await f.write(json.dumps(json_data, indent=4, ensure_ascii=False))
+def record2adata(record: dict) -> AData:
+    """
+    存储记录转换为 AData
+    当前版本写入的记录跳过校验直接构建, 其余记录完整校验
+    """
+    adata_class = ADATA_CLASS.get(record.get("__type__", None), AData)
+    if record.get("__version__") == ADATA_SCHEMA_VERSION:
+        return construct_adata(adata_class, record)
+    return adata_class(**record)
+
+
+async def save_adatas(adatas: List[AData], subscription: Subscription):
+    """
+    保存数据, id 相同的覆盖
+    """
+    await get_storage().save(
+        subscription.name, [adata2record(adata) for adata in adatas]
+    )
+    await add_seen_ids(subscription.name, [adata.id for adata in adatas])
 
 
 async def load_adatas(subscription: Subscription) -> List[AData]:
@@ -34,33 +56,21 @@ async def load_adatas(subscription: Subscription) -> List[AData]:
     读取数据
     """
     result = []
-    try:
-        async with aiofiles.open(
-            f"{config.data_path}/{subscription.name}.json", "r", encoding="utf-8"
-        ) as f:
-            adatas = json.loads(await f.read())
-            for adata in adatas:
-                adata_class = ADATA_CLASS.get(adata.get("__type__", None), AData)
-                if adata_class:
-                    result.append(adata_class(**adata))
-            return result
-    except Exception:
-        return result
+    for record in await get_storage().load(subscription.name):
+        try:
+            result.append(record2adata(record))
+        except Exception:
+            continue
+    return result
 
 
-async def check_adatas(adatas: List[AData], subscription: Subscription) -> List[AData]:
+async def save_ids(ids: List[str], subscription: Subscription):
     """
-    检查数据是否重复
+    只保存 id, 用于去重复, 如被关键词过滤掉的数据
     """
-    # 读取数据
-    old_adatas = await load_adatas(subscription)
-    old_id_set = set([old_adata.id for old_adata in old_adatas])
-    if not old_id_set:
-        await save_adatas(adatas, subscription)
-        return []
-    # 去重复
-    new_adatas = []
-    for adata in adatas:
-        if adata.id not in old_id_set:
-            new_adatas.append(adata)
-    return new_adatas
+    push_time = get_timestamp()
+    await get_storage().save(
+        subscription.name,
+        [{"id": id, "push_time": push_time, IDS_ONLY_KEY: True} for id in ids],
+    )
+    await add_seen_ids(subscription.name, ids)
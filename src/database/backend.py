@@ -0,0 +1,388 @@
+"""
+数据存储后端
+AData 的持久化, 支持 json 文件和 sqlite
+"""
+
+import asyncio
+import functools
+import os
+import sqlite3
+from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import aiofiles
+from loguru import logger
+
+from config import config
+from src.models import RetentionPolicy
+from src.utils import get_timestamp
+from src.utils.atomic import atomic_write
+from src.utils.serialize import dumps, loads
+
+# 只保留 id 的记录标记, 只用于去重复, 读取数据时跳过
+IDS_ONLY_KEY = "__ids_only__"
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def corrupt_path(path: str) -> str:
+    """
+    损坏文件的保存路径, 带时间戳, 不会覆盖之前移走的文件
+    """
+    return f"{path}.corrupt.{get_timestamp()}"
+
+
+class ADataStorage(metaclass=ABCMeta):
+    """
+    存储后端基类, 以订阅名称区分数据
+    记录为 dict, 必须包含 id 字段, __type__ 字段为 AData 类名
+    """
+
+    @abstractmethod
+    async def save(self, name: str, records: List[dict]) -> None:
+        """
+        保存记录, id 相同的覆盖
+        """
+
+    @abstractmethod
+    async def load(self, name: str) -> List[dict]:
+        """
+        读取全部记录
+        """
+
+    @abstractmethod
+    async def load_ids(self, name: str) -> List[str]:
+        """
+        读取全部 id, 不读取记录内容
+        """
+
+    @abstractmethod
+    async def compact(
+        self,
+        name: str,
+        policy: RetentionPolicy,
+        fetched_ids: Optional[Set[str]] = None,
+    ) -> int:
+        """
+        按保留策略压缩数据, 返回回收的字节数
+        fetched_ids: 最近一次抓取到的 id, 设置了 max_days 时,
+        超过天数且不在其中的 id 一起删除, 为空时不删除
+        """
+
+    async def close(self) -> None:
+        """
+        关闭存储
+        """
+
+
+class JsonADataStorage(ADataStorage):
+    """
+    json 文件存储, 每个订阅一个文件 data/{name}.json
+    第一次访问时读取到内存, 之后只写不读, 写入为原子替换
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._records: Dict[str, Dict[str, dict]] = {}
+
+    def file_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.json")
+
+    async def _records_of(self, name: str) -> Dict[str, dict]:
+        records = self._records.get(name)
+        if records is None:
+            file_path = self.file_path(name)
+            try:
+                async with aiofiles.open(file_path, "r", encoding="utf-8") as f:
+                    data = {record["id"]: record for record in loads(await f.read())}
+            except FileNotFoundError:
+                data = {}
+            except Exception as e:
+                # 移走损坏的文件再重新开始, 不能直接覆盖, 否则原有数据全部丢失
+                # 移动失败时抛出异常, 不写入
+                corrupt = corrupt_path(file_path)
+                os.replace(file_path, corrupt)
+                logger.error(f"数据文件读取失败: {file_path}, {e}, 已移动到 {corrupt}")
+                data = {}
+            # 读取期间可能已经被其他任务读取
+            records = self._records.setdefault(name, data)
+        return records
+
+    async def _read(self, name: str) -> List[dict]:
+        return list((await self._records_of(name)).values())
+
+    async def _write(self, name: str, records: List[dict]) -> None:
+        self._records[name] = {record["id"]: record for record in records}
+        await atomic_write(self.file_path(name), dumps(records))
+
+    async def save(self, name: str, records: List[dict]) -> None:
+        # 合并去重复, id 相同的覆盖
+        old_records = await self._records_of(name)
+        for record in records:
+            old_records[record["id"]] = record
+        await atomic_write(self.file_path(name), dumps(list(old_records.values())))
+
+    async def load(self, name: str) -> List[dict]:
+        return [
+            record for record in await self._read(name) if not record.get(IDS_ONLY_KEY)
+        ]
+
+    async def load_ids(self, name: str) -> List[str]:
+        return [record["id"] for record in await self._read(name)]
+
+    async def compact(
+        self,
+        name: str,
+        policy: RetentionPolicy,
+        fetched_ids: Optional[Set[str]] = None,
+    ) -> int:
+        file_path = self.file_path(name)
+        if not os.path.isfile(file_path):
+            return 0
+        size = os.path.getsize(file_path)
+        now = get_timestamp()
+
+        def age(record: dict) -> int:
+            return record.get("push_time") or now
+
+        records = await self._read(name)
+        full_records = sorted(
+            (r for r in records if not r.get(IDS_ONLY_KEY)), key=age, reverse=True
+        )
+        ids_only = set()
+        # 订阅源仍在返回的 id 不能删除, 否则旧条目会被当作新条目再次推送
+        ids_only_days = policy.get_ids_only_days()
+        if ids_only_days:
+            cutoff = now - ids_only_days * DAY_MS
+            ids_only.update(r["id"] for r in full_records if age(r) < cutoff)
+        if policy.max_items:
+            ids_only.update(r["id"] for r in full_records[policy.max_items :])
+        records = [
+            {"id": r["id"], "push_time": r.get("push_time"), IDS_ONLY_KEY: True}
+            if r["id"] in ids_only
+            else r
+            for r in records
+        ]
+        if policy.max_days and fetched_ids is not None:
+            cutoff = now - policy.max_days * DAY_MS
+            records = [
+                r
+                for r in records
+                if not r.get(IDS_ONLY_KEY)
+                or age(r) >= cutoff
+                or r["id"] in fetched_ids
+            ]
+        await self._write(name, records)
+        return size - os.path.getsize(file_path)
+
+
+class SqliteADataStorage(ADataStorage):
+    """
+    sqlite 存储, WAL 模式, (subscription, id) 为主键
+
+    sqlite 是同步接口, 所有操作放在单线程里串行执行, 不阻塞事件循环
+    首次访问某个订阅时, 自动把旧的 data/{name}.json 迁移进来
+    """
+
+    def __init__(self, path: str, json_path: str):
+        self.path = path
+        self.json_path = json_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="adata-sqlite"
+        )
+        self._migrated: Set[str] = set()
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args)
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            # auto_vacuum 只能在建表前设置
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS adata (
+                    subscription TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    type TEXT,
+                    push_time INTEGER,
+                    created_at INTEGER NOT NULL,
+                    data TEXT,
+                    PRIMARY KEY (subscription, id)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS adata_push_time "
+                "ON adata (subscription, push_time)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _migrate(self, name: str) -> None:
+        """
+        迁移旧的 json 文件, 迁移后重命名为 {name}.json.migrated
+        """
+        if name in self._migrated:
+            return
+        self._migrated.add(name)
+        json_file = os.path.join(self.json_path, f"{name}.json")
+        if not os.path.isfile(json_file):
+            return
+        try:
+            with open(json_file, "r", encoding="utf-8") as f:
+                records = loads(f.read())
+            self._save(name, records, migrate=False)
+            os.replace(json_file, f"{json_file}.migrated")
+            logger.info(f"迁移数据到 sqlite: {name}, {len(records)} 条")
+        except Exception as e:
+            logger.error(f"迁移数据失败: {name}, {e}")
+
+    def _save(self, name: str, records: List[dict], migrate: bool = True) -> None:
+        if migrate:
+            self._migrate(name)
+        conn = self._connect()
+        created_at = get_timestamp()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO adata "
+                "(subscription, id, type, push_time, created_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        name,
+                        record["id"],
+                        record.get("__type__"),
+                        record.get("push_time"),
+                        created_at,
+                        None
+                        if record.get(IDS_ONLY_KEY)
+                        else dumps(record),
+                    )
+                    for record in records
+                ],
+            )
+
+    def _load(self, name: str) -> List[dict]:
+        self._migrate(name)
+        rows = self._connect().execute(
+            "SELECT data FROM adata WHERE subscription = ? AND data IS NOT NULL "
+            "ORDER BY created_at",
+            (name,),
+        )
+        return [loads(row[0]) for row in rows]
+
+    def _load_ids(self, name: str) -> List[str]:
+        self._migrate(name)
+        rows = self._connect().execute(
+            "SELECT id FROM adata WHERE subscription = ?", (name,)
+        )
+        return [row[0] for row in rows]
+
+    def _compact(
+        self, name: str, policy: RetentionPolicy, fetched_ids: Optional[Set[str]]
+    ) -> int:
+        self._migrate(name)
+        conn = self._connect()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        before = conn.execute("PRAGMA page_count").fetchone()[0]
+        now = get_timestamp()
+        age = "COALESCE(push_time, created_at)"
+        # 订阅源仍在返回的 id 不能删除, 否则旧条目会被当作新条目再次推送
+        ids_only_days = policy.get_ids_only_days()
+        with conn:
+            if ids_only_days:
+                conn.execute(
+                    "UPDATE adata SET data = NULL WHERE subscription = ? "
+                    f"AND data IS NOT NULL AND {age} < ?",
+                    (name, now - ids_only_days * DAY_MS),
+                )
+            if policy.max_items:
+                conn.execute(
+                    "UPDATE adata SET data = NULL WHERE subscription = ? "
+                    "AND data IS NOT NULL AND id NOT IN ("
+                    "SELECT id FROM adata WHERE subscription = ? "
+                    f"AND data IS NOT NULL ORDER BY {age} DESC LIMIT ?)",
+                    (name, name, policy.max_items),
+                )
+            if policy.max_days and fetched_ids is not None:
+                rows = conn.execute(
+                    "SELECT id FROM adata WHERE subscription = ? "
+                    f"AND data IS NULL AND {age} < ?",
+                    (name, now - policy.max_days * DAY_MS),
+                ).fetchall()
+                conn.executemany(
+                    "DELETE FROM adata WHERE subscription = ? AND id = ?",
+                    [(name, row[0]) for row in rows if row[0] not in fetched_ids],
+                )
+        # executescript 会一直执行到结束, execute 只会回收一页
+        conn.executescript("PRAGMA incremental_vacuum; PRAGMA wal_checkpoint(TRUNCATE);")
+        after = conn.execute("PRAGMA page_count").fetchone()[0]
+        return (before - after) * page_size
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def save(self, name: str, records: List[dict]) -> None:
+        await self._run(self._save, name, records)
+
+    async def load(self, name: str) -> List[dict]:
+        return await self._run(self._load, name)
+
+    async def load_ids(self, name: str) -> List[str]:
+        return await self._run(self._load_ids, name)
+
+    async def compact(
+        self,
+        name: str,
+        policy: RetentionPolicy,
+        fetched_ids: Optional[Set[str]] = None,
+    ) -> int:
+        return await self._run(self._compact, name, policy, fetched_ids)
+
+    async def close(self) -> None:
+        await self._run(self._close)
+
+
+STORAGES: Dict[str, Callable[[], ADataStorage]] = {
+    "json": lambda: JsonADataStorage(config.data_path),
+    "sqlite": lambda: SqliteADataStorage(
+        os.path.join(config.data_path, "adata.db"), config.data_path
+    ),
+}
+
+_storage: Optional[ADataStorage] = None
+
+
+def get_storage() -> ADataStorage:
+    """
+    获取当前配置的存储后端
+    """
+    global _storage
+    if _storage is None:
+        if config.adata_storage not in STORAGES:
+            logger.error(f"未知的存储后端: {config.adata_storage}, 使用 json")
+        _storage = STORAGES.get(config.adata_storage, STORAGES["json"])()
+    return _storage
+
+
+async def close_storage() -> None:
+    """
+    关闭存储后端
+    """
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
@@ -0,0 +1,230 @@
+"""
+Action 发件箱
+新数据先写入发件箱, 每个 Action 执行成功后再确认删除, 失败按指数退避重试, 重启后继续投递
+"""
+
+import asyncio
+import functools
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+from loguru import logger
+
+from config import config
+from src.database.adata import adata2record, record2adata
+from src.models import AData, Subscription
+from src.utils import get_timestamp
+from src.utils.serialize import dumps, loads
+
+
+class OutboxEntry:
+    """
+    发件箱中的一条记录, 一个 Action 对应一条 AData
+    """
+
+    def __init__(
+        self, id: int, subscription: str, action: str, adata: AData, attempts: int
+    ):
+        self.id = id
+        self.subscription = subscription
+        self.action = action
+        self.adata = adata
+        self.attempts = attempts
+
+
+class Outbox:
+    """
+    sqlite 发件箱, 所有操作在单线程里串行执行
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="outbox"
+        )
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args)
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    subscription TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    record TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_try INTEGER NOT NULL,
+                    created_at INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS outbox_next_try "
+                "ON outbox (subscription, next_try)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _put(self, subscription: str, actions: List[str], records: List[dict]) -> None:
+        now = get_timestamp()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO outbox "
+                "(subscription, action, record, next_try, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        subscription,
+                        action,
+                        dumps(record),
+                        now,
+                        now,
+                    )
+                    for action in actions
+                    for record in records
+                ],
+            )
+
+    def _claim(self, subscription: str, limit: int, lease: int) -> List[tuple]:
+        """
+        取出到期的记录, 并把下次投递时间推迟 lease 毫秒, 防止重复投递
+        进程退出时未确认的记录, 租期过后会重新投递
+        """
+        now = get_timestamp()
+        conn = self._connect()
+        with conn:
+            rows = conn.execute(
+                "SELECT id, subscription, action, record, attempts FROM outbox "
+                "WHERE subscription = ? AND next_try <= ? ORDER BY id LIMIT ?",
+                (subscription, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET next_try = ? WHERE id = ?",
+                [(now + lease, row[0]) for row in rows],
+            )
+        return rows
+
+    def _renew(self, ids: List[int], lease: int) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE outbox SET next_try = ? WHERE id = ?",
+                [(get_timestamp() + lease, i) for i in ids],
+            )
+
+    def _ack(self, ids: List[int]) -> None:
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def _retry(self, ids: List[int], attempts: int, delay: int) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE outbox SET attempts = ?, next_try = ? WHERE id = ?",
+                [(attempts, get_timestamp() + delay, i) for i in ids],
+            )
+
+    def _pending_subscriptions(self) -> List[str]:
+        rows = self._connect().execute(
+            "SELECT DISTINCT subscription FROM outbox WHERE next_try <= ?",
+            (get_timestamp(),),
+        )
+        return [row[0] for row in rows]
+
+    def _drop_subscription(self, subscription: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM outbox WHERE subscription = ?", (subscription,))
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def put(self, subscription: str, actions: List[str], adatas: List[AData]):
+        """
+        写入发件箱
+        """
+        records = [adata2record(adata) for adata in adatas]
+        await self._run(self._put, subscription, actions, records)
+
+    async def claim(
+        self, subscription: str, limit: int, lease: int
+    ) -> List[OutboxEntry]:
+        """
+        取出到期的记录
+        """
+        entries = []
+        for id, name, action, record, attempts in await self._run(
+            self._claim, subscription, limit, lease
+        ):
+            try:
+                adata = record2adata(loads(record))
+            except Exception as e:
+                logger.error(f"发件箱记录解析失败, 丢弃: {id}, {e}")
+                await self.ack([id])
+                continue
+            entries.append(OutboxEntry(id, name, action, adata, attempts))
+        return entries
+
+    async def renew(self, ids: List[int], lease: int) -> None:
+        """
+        延长租期, 排队或执行中的记录不会被其他投递取走
+        """
+        await self._run(self._renew, ids, lease)
+
+    async def ack(self, ids: List[int]) -> None:
+        """
+        投递成功, 删除记录
+        """
+        await self._run(self._ack, ids)
+
+    async def retry(self, ids: List[int], attempts: int) -> None:
+        """
+        投递失败, 按指数退避推迟下次投递
+        """
+        delay = min(
+            config.outbox_retry_base * 2 ** (attempts - 1), config.outbox_retry_max
+        )
+        await self._run(self._retry, ids, attempts, int(delay * 1000))
+
+    async def pending_subscriptions(self) -> List[str]:
+        """
+        有待投递记录的订阅
+        """
+        return await self._run(self._pending_subscriptions)
+
+    async def drop_subscription(self, subscription: str) -> None:
+        """
+        删除订阅的全部记录
+        """
+        await self._run(self._drop_subscription, subscription)
+
+    async def close(self) -> None:
+        await self._run(self._close)
+
+
+outbox = Outbox(os.path.join(config.data_path, "outbox.db"))
+
+
+async def enqueue(subscription: Subscription, adatas: List[AData]) -> None:
+    """
+    新数据写入发件箱, 每个支持的 Action 一条记录
+    """
+    actions = [
+        action.name
+        for action in subscription.actions
+        if action.name in subscription.spider.support_actions
+    ]
+    if actions and adatas:
+        await outbox.put(subscription.name, actions, adatas)
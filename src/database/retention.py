@@ -0,0 +1,41 @@
+"""
+历史数据保留策略
+定时按订阅的保留策略压缩历史数据
+设置了 max_days 时, 超过天数且最近一次抓取中没有出现的 id 也会删除
+提前停止解析时没有读到的条目都在第一条已读数据之后, 之后也不会被解析到
+"""
+
+from loguru import logger
+
+from src.database import load_subscriptions
+from src.database.backend import get_storage
+from src.database.seen import FETCHED_IDS, drop_seen_index
+from src.utils import convert_size
+
+
+async def compact_subscriptions() -> int:
+    """
+    压缩所有设置了保留策略的订阅, 返回回收的字节数
+    """
+    total = 0
+    for subscription in await load_subscriptions():
+        if subscription.retention.is_empty():
+            continue
+        try:
+            reclaimed = await get_storage().compact(
+                subscription.name,
+                subscription.retention,
+                FETCHED_IDS.get(subscription.name),
+            )
+        except Exception as e:
+            logger.error(f"压缩历史数据失败: {subscription.name}, {e}")
+            continue
+        if subscription.retention.max_days:
+            # 删除了 id, 已读索引下次使用时重新读取
+            drop_seen_index(subscription.name, keep_fetched=True)
+        total += reclaimed
+        logger.info(
+            f"压缩历史数据: {subscription.name}, 回收 {convert_size(max(reclaimed, 0))}"
+        )
+    logger.info(f"压缩历史数据完成, 共回收 {convert_size(max(total, 0))}")
+    return total
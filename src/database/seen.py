@@ -0,0 +1,155 @@
+"""
+已读 id 索引
+常驻内存, 每个订阅启动时读取一次, 之后增量更新, 去重复时不再读取完整记录
+"""
+
+import asyncio
+import hashlib
+import math
+from typing import Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+
+from config import config
+from src.database.backend import get_storage
+
+
+class BloomFilter:
+    """
+    布隆过滤器, 用于压缩大量历史 id
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(
+            int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8
+        )
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class SeenIndex:
+    """
+    单个订阅的已读 id 索引
+    """
+
+    def __init__(self, name: str, ids: Iterable[str]):
+        self.name = name
+        self.ids: Set[str] = set(ids)
+        self.bloom: Optional[BloomFilter] = None
+
+    def __contains__(self, id: str) -> bool:
+        return id in self.ids or (self.bloom is not None and id in self.bloom)
+
+    def __len__(self) -> int:
+        return len(self.ids) + (self.bloom.count if self.bloom else 0)
+
+    def add(self, ids: Iterable[str]) -> None:
+        self.ids.update(ids)
+
+    def need_compact(self) -> bool:
+        threshold = config.seen_index_bloom_threshold
+        return threshold > 0 and len(self.ids) > threshold
+
+    async def compact(self) -> None:
+        """
+        将内存中的 id 压缩进布隆过滤器
+        过滤器容量不够时, 从存储重新读取全部 id 重建
+        """
+        if self.bloom is None or self.bloom.count + len(self.ids) > self.bloom.capacity:
+            ids = set(await get_storage().load_ids(self.name))
+            ids.update(self.ids)
+            self.bloom = BloomFilter(
+                max(len(ids) * 2, config.seen_index_bloom_threshold),
+                config.seen_index_bloom_error_rate,
+            )
+        else:
+            ids = self.ids
+        for id in ids:
+            self.bloom.add(id)
+        self.ids = set()
+        logger.debug(f"已读索引压缩: {self.name}, {self.bloom.count} 条")
+
+
+SEEN_INDEXES: Dict[str, SeenIndex] = {}
+
+# 最近一次抓取到的 id, {订阅名称: id}, 压缩历史数据时订阅源仍在返回的 id 不删除
+FETCHED_IDS: Dict[str, Set[str]] = {}
+
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+async def get_seen_index(name: str) -> SeenIndex:
+    """
+    获取订阅的已读索引, 第一次使用时从存储读取
+    """
+    index = SEEN_INDEXES.get(name)
+    if index is not None:
+        return index
+    lock = _locks.setdefault(name, asyncio.Lock())
+    async with lock:
+        index = SEEN_INDEXES.get(name)
+        if index is None:
+            index = SeenIndex(name, await get_storage().load_ids(name))
+            if index.need_compact():
+                await index.compact()
+            SEEN_INDEXES[name] = index
+    return index
+
+
+async def load_seen_indexes(names: List[str]) -> None:
+    """
+    启动时读取所有订阅的已读索引
+    """
+    for name in names:
+        await get_seen_index(name)
+
+
+async def add_seen_ids(name: str, ids: List[str]) -> None:
+    """
+    保存数据后更新索引, 索引未读取时不处理
+    """
+    index = SEEN_INDEXES.get(name)
+    if index is None:
+        return
+    index.add(ids)
+    if index.need_compact():
+        await index.compact()
+
+
+def set_fetched_ids(name: str, ids: Set[str]) -> None:
+    """
+    记录最近一次抓取到的 id
+    """
+    FETCHED_IDS[name] = ids
+
+
+def drop_seen_index(name: str, keep_fetched: bool = False) -> None:
+    """
+    删除订阅的已读索引
+    keep_fetched: 保留最近一次抓取到的 id, 只让索引下次使用时重新读取
+    """
+    SEEN_INDEXES.pop(name, None)
+    _locks.pop(name, None)
+    if not keep_fetched:
+        FETCHED_IDS.pop(name, None)
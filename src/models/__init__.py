@@ -1,5 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 from typing import Any, List, Optional
+from xml.etree import ElementTree
+
+from src.utils.keyword import KeywordMatcher
+from src.utils.serialize import loads
 
 
 class AData(BaseModel):
@@ -48,6 +52,38 @@ class AData(BaseModel):
     """
 
 
+class RetentionPolicy(BaseModel):
+    """
+    历史数据保留策略, 为空则不限制
+    """
+
+    max_items: Optional[int] = None
+    """
+    最多保留多少条完整数据, 超出的旧数据只保留 id
+    """
+
+    max_days: Optional[int] = None
+    """
+    按 push_time 保留多少天, 超出的数据只保留 id
+    id 在最近一次抓取中也没有出现时删除, 订阅源仍在返回的旧条目保留 id, 避免重复推送
+    """
+
+    ids_only_days: Optional[int] = None
+    """
+    超过多少天的数据只保留 id, 只用于去重复
+    """
+
+    def is_empty(self) -> bool:
+        return not (self.max_items or self.max_days or self.ids_only_days)
+
+    def get_ids_only_days(self) -> Optional[int]:
+        """
+        超过多少天的数据只保留 id, max_days 和 ids_only_days 取较小值
+        """
+        days = [d for d in (self.max_days, self.ids_only_days) if d]
+        return min(days) if days else None
+
+
 class Subscription(BaseModel):
     """
     订阅模型
@@ -86,6 +122,11 @@ class Subscription(BaseModel):
     是否启用代理
     """
 
+    adaptive: bool = False
+    """
+    是否根据更新频率自动调整抓取间隔, cron 为最短间隔
+    """
+
     white_keywords: Optional[List[str]] = []
     """
     白名单关键词, 满足其中一个关键词则推送, 为空则不限制
@@ -98,6 +139,42 @@ class Subscription(BaseModel):
     支持正则表达式
     """
 
+    retention: RetentionPolicy = RetentionPolicy()
+    """
+    历史数据保留策略
+    """
+
+    _white_matcher: Optional[KeywordMatcher] = PrivateAttr(default=None)
+
+    _black_matcher: Optional[KeywordMatcher] = PrivateAttr(default=None)
+
+    def get_white_matcher(self) -> KeywordMatcher:
+        """
+        白名单匹配器, 关键词变化时重新编译
+        """
+        keywords = tuple(self.white_keywords or [])
+        if self._white_matcher is None or self._white_matcher.keywords != keywords:
+            self._white_matcher = KeywordMatcher(list(keywords))
+        return self._white_matcher
+
+    def get_black_matcher(self) -> KeywordMatcher:
+        """
+        黑名单匹配器, 关键词变化时重新编译
+        """
+        keywords = tuple(self.black_keywords or [])
+        if self._black_matcher is None or self._black_matcher.keywords != keywords:
+            self._black_matcher = KeywordMatcher(list(keywords))
+        return self._black_matcher
+
+    def match_keywords(self, title: Optional[str], content: Optional[str]) -> bool:
+        """
+        是否满足白名单且不满足黑名单
+        """
+        white_matcher = self.get_white_matcher()
+        if white_matcher and not white_matcher.search(title, content):
+            return False
+        return not self.get_black_matcher().search(title, content)
+
     def to_json(self):
         return self.dict()
 
@@ -114,7 +191,7 @@ class Response(BaseModel):
 
     content: Any
     """
-    响应内容
+    响应内容, http 请求时为原始 bytes, 需要时再通过 text / json / xml 解码
     """
 
     headers: dict
@@ -122,8 +199,62 @@ class Response(BaseModel):
     响应头
     """
 
+    encoding: Optional[str] = None
+    """
+    响应头中的字符编码, 为空时按 utf-8 解码
+    """
+
+    stream: Optional[Any] = None
+    """
+    流式响应, 不为空时 content 为空, 用 aiter_bytes 逐块读取, 读取完成后需要 aclose
+    """
+
     def is_success(self) -> bool:
         """
         判断是否成功, 200-299 为成功
         """
         return 200 <= self.status_code < 300
+
+    def is_not_modified(self) -> bool:
+        """
+        判断是否未修改, 条件请求命中时返回 304
+        """
+        return self.status_code == 304
+
+    _text: Optional[str] = PrivateAttr(default=None)
+
+    @property
+    def text(self) -> Optional[str]:
+        """
+        解码后的文本, 第一次访问时解码
+        """
+        if not isinstance(self.content, bytes):
+            return self.content
+        if self._text is None:
+            try:
+                self._text = self.content.decode(self.encoding or "utf-8", "replace")
+            except LookupError:
+                self._text = self.content.decode("utf-8", "replace")
+        return self._text
+
+    def json(self) -> Any:
+        """
+        按 json 解析, 直接解析原始 bytes
+        """
+        if isinstance(self.content, (bytes, str)):
+            return loads(self.content)
+        return self.content
+
+    def xml(self) -> ElementTree.Element:
+        """
+        按 xml 解析, 直接解析原始 bytes, 编码以 xml 声明为准
+        """
+        return ElementTree.fromstring(self.content)
+
+    async def aclose(self) -> None:
+        """
+        关闭流式响应
+        """
+        if self.stream is not None:
+            await self.stream.aclose()
+            self.stream = None
@@ -7,6 +7,7 @@ from src.models import Subscription
 from loguru import logger
 
 from src.action import ACTIONS_FUN_LIST
+from src.utils.static_config import get_static_config
 
 SPIDES = []
 ADATA_CLASS = {}
@@ -90,7 +91,9 @@ def create_spider(data: dict):
     for spider in SPIDES:
         if data["name"] == spider.name:
             spider_data = spider.__class__(**data)
-            spider_data.static_config = spider.static_config.__class__()
+            spider_data.static_config = get_static_config(
+                spider.static_config.__class__
+            )
             return spider_data
 
 
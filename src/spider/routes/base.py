@@ -3,23 +3,37 @@ Spider 部分
 """
 
 import asyncio
-import re
-from typing import Callable, Optional, List
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    ClassVar,
+    Dict,
+    Optional,
+    List,
+    Tuple,
+)
 import arrow
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from telethon import TelegramClient, events
 from src.bot import telegram_upload_file
 from src.bot.inputs import url_input
-from src.database.adata import check_adatas, save_adatas
+from src.database.adata import save_adatas, save_ids
+from src.database.outbox import enqueue
+from src.database.seen import get_seen_index, set_fetched_ids
 from src.models import AData, Subscription
 from src.utils import get_timestamp, timestamp2human
-from src.utils.pic_download import pic_download
+from src.utils.pic_download import pic_download_cache
 from src.utils.request import get, Response
 from config import config, env_config
 from loguru import logger
 
 
+# 条件请求的校验值, {订阅名称: {"url": url, "etag": etag, "last_modified": last_modified}}
+CONDITIONAL_VALIDATORS: Dict[str, Dict[str, Optional[str]]] = {}
+
+
 class BaseSpiderAData(AData):
     """
     Spider 数据模型 基类, 所有 Spider 数据模型都可以继承此类或者直接继承AData
@@ -31,12 +45,12 @@ class BaseSpiderAData(AData):
 
     async def download_pic_bytes(self) -> Optional[List[bytes]]:
         """
-        下载图片
+        下载图片, 已缓存的图片不再下载
         """
         if self.pic_url and len(self.pic_bytes) != len(self.pic_url):
             tasks = []
             for url in self.pic_url:
-                tasks.append(pic_download(url, proxy=config.proxy))
+                tasks.append(pic_download_cache(url, proxy=config.proxy))
             self.pic_bytes = await asyncio.gather(*tasks)
         return self.pic_bytes
 
@@ -155,12 +169,37 @@ class BaseSpider(BaseModel):
     动态配置
     """
 
+    extend_fields: ClassVar[List[str]] = []
+    """
+    原始数据中需要保留到 extend 的字段, 其余字段不存储
+    支持 . 分隔的嵌套字段, 如: user.screen_name
+    """
+
     def get_only_id(self, id) -> Optional[str]:
         """
         获取唯一id,带前缀
         """
         return f"{self.prefix}_{id}"
 
+    def project_extend(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        按 extend_fields 裁剪原始数据
+        """
+        result: Dict[str, Any] = {}
+        for field in self.extend_fields:
+            value: Any = raw
+            for key in field.split("."):
+                if not isinstance(value, dict) or key not in value:
+                    break
+                value = value[key]
+            else:
+                target = result
+                keys = field.split(".")
+                for key in keys[:-1]:
+                    target = target.setdefault(key, {})
+                target[keys[-1]] = value
+        return result
+
     async def request(self, subscription: Subscription) -> Optional[Response]:
         """
         请求数据
@@ -169,12 +208,54 @@ class BaseSpider(BaseModel):
         proxy = None
         if subscription.enable_proxy:
             proxy = config.proxy
+        url = subscription.spider.dynamic_config.url
         try:
-            return await get(subscription.spider.dynamic_config.url, proxy=proxy)
+            return await get(
+                url,
+                headers=self.get_conditional_headers(subscription, url),
+                proxy=proxy,
+                cache=True,
+            )
         except Exception as e:
             logger.error(f"Spider {self.name} request error: {e}")
             return None
 
+    def get_conditional_headers(
+        self, subscription: Subscription, url: Optional[str]
+    ) -> Dict[str, str]:
+        """
+        条件请求头, 使用上次响应的 ETag / Last-Modified
+        """
+        validators = CONDITIONAL_VALIDATORS.get(subscription.name)
+        # url 变化后, 之前的校验值失效
+        if not validators or validators.get("url") != url:
+            return {}
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        return headers
+
+    def save_conditional_validators(
+        self, subscription: Subscription, url: Optional[str], response: Response
+    ) -> None:
+        """
+        保存响应的 ETag / Last-Modified, 处理成功后再保存, 避免处理失败后一直 304
+        """
+        if not response.is_success():
+            return
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if etag or last_modified:
+            CONDITIONAL_VALIDATORS[subscription.name] = {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+            }
+        else:
+            CONDITIONAL_VALIDATORS.pop(subscription.name, None)
+
     async def parse(
         self, subscription: Subscription, response: Response
     ) -> Optional[List[BaseSpiderAData]]:
@@ -185,7 +266,7 @@ class BaseSpider(BaseModel):
             BaseSpiderAData(
                 id=self.get_only_id(get_timestamp()),
                 title=subscription.name,
-                content=f"{response.content[:100]}...",
+                content=f"{response.text[:100]}...",
                 url=subscription.spider.dynamic_config.url,
                 source=subscription.name,
                 push_time=get_timestamp(),
@@ -193,51 +274,124 @@ class BaseSpider(BaseModel):
             )
         ]
 
+    async def parse_entries(
+        self, subscription: Subscription, response: Response
+    ) -> AsyncIterator[Any]:
+        """
+        分阶段解析, 逐条返回原始条目, 配合 entry_id / entry_text / build_adata 使用
+        只有新数据才会构建完整的 AData
+        默认直接返回 parse 的结果
+        """
+        for adata in await self.parse(subscription, response) or []:
+            yield adata
+
+    def entry_id(self, entry: Any) -> str:
+        """
+        原始条目的唯一id, 带前缀
+        """
+        return entry.id
+
+    def entry_text(self, entry: Any) -> Tuple[Optional[str], Optional[str]]:
+        """
+        原始条目的标题和内容, 用于关键词过滤
+        """
+        return entry.title, entry.content
+
+    def stop_on_seen(self, subscription: Subscription) -> bool:
+        """
+        遇到已读条目时是否停止解析, 只适用于按时间倒序排列的数据
+        """
+        return False
+
+    async def build_adata(
+        self, subscription: Subscription, entry: Any
+    ) -> BaseSpiderAData:
+        """
+        原始条目构建 AData
+        """
+        return entry
+
     async def start(
         self, subscription: Subscription
     ) -> Optional[List[BaseSpiderAData]]:
         """
         开始流程
+        请求 -> 解析原始条目 -> 去重复 -> 关键词过滤 -> 构建 AData -> 处理新数据
         """
         response = await self.request(subscription)
-        if response:
-            adatas = await self.parse(subscription, response)
-            if adatas:
-                new_adatas = await self.filter(adatas, subscription)
-                new_adatas = await self.handle_new_adata(new_adatas, subscription)
-                return new_adatas
-        else:
+        if not response:
             return None
+        try:
+            if response.is_not_modified():
+                logger.debug(f"订阅未更新(304): {subscription.name}")
+                return None
+            new_adatas = await self.filter(
+                self.parse_entries(subscription, response), subscription
+            )
+        finally:
+            await response.aclose()
+        if new_adatas:
+            adatas = new_adatas
+            new_adatas = await self.handle_new_adata(adatas, subscription)
+            # 先写入发件箱再标记为已读, 中途失败时下次抓取会重新处理这些数据
+            await enqueue(subscription, new_adatas)
+            await save_adatas(adatas, subscription)
+        self.save_conditional_validators(
+            subscription, subscription.spider.dynamic_config.url, response
+        )
+        return new_adatas or None
 
     async def filter(
-        self, adatas: List[AData], subscription: Subscription
-    ) -> List[AData]:
+        self, entries: AsyncIterator[Any], subscription: Subscription
+    ) -> List[BaseSpiderAData]:
         """
         过滤数据
+        首次抓取只保存不推送, 被关键词过滤掉的数据只保存 id
+        返回的新数据不在这里保存, 由 start 写入发件箱后再保存
+        stop_on_seen 为真时, 遇到第一条已读数据就停止解析
         """
-        result = []
-        datas = await check_adatas(adatas, subscription)
-        if datas:
-            await save_adatas(datas, subscription)
-        if subscription.white_keywords:
-            for data in datas:
-                for keyword in subscription.white_keywords:
-                    title = data.title or ""
-                    content = data.content or ""
-                    if re.search(keyword, title) or re.search(keyword, content):
-                        result.append(data)
-        else:
-            result = datas
-
-        if subscription.black_keywords:
-            for data in datas:
-                for keyword in subscription.black_keywords:
-                    title = data.title or ""
-                    content = data.content or ""
-                    if re.search(keyword, title) or re.search(keyword, content):
-                        result.remove(data)
-
-        return result
+        seen_index = await get_seen_index(subscription.name)
+        first_fetch = not seen_index
+        stop_on_seen = not first_fetch and self.stop_on_seen(subscription)
+        new_entries = {}
+        # 订阅源返回的 id, 提前停止时只包含第一条已读数据之前的部分
+        fetched_ids = set()
+        try:
+            async for entry in entries:
+                id = self.entry_id(entry)
+                fetched_ids.add(id)
+                if id in seen_index:
+                    if stop_on_seen:
+                        break
+                elif id not in new_entries:
+                    new_entries[id] = entry
+        finally:
+            await entries.aclose()
+        if fetched_ids:
+            # 订阅源返回空列表时多半是出错, 保留上一次的 id
+            set_fetched_ids(subscription.name, fetched_ids)
+        if not new_entries:
+            return []
+
+        if first_fetch:
+            adatas = [
+                await self.build_adata(subscription, entry)
+                for entry in new_entries.values()
+            ]
+            await save_adatas(adatas, subscription)
+            return []
+
+        # 关键词预先编译, 单次遍历过滤
+        adatas = []
+        filtered_ids = []
+        for id, entry in new_entries.items():
+            if subscription.match_keywords(*self.entry_text(entry)):
+                adatas.append(await self.build_adata(subscription, entry))
+            else:
+                filtered_ids.append(id)
+        if filtered_ids:
+            await save_ids(filtered_ids, subscription)
+        return adatas
 
     async def handle_new_adata(
         self, adatas: List[BaseSpiderAData], subscription: Subscription
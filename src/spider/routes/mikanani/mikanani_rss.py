@@ -4,19 +4,33 @@ Spider部分
 
 from contextlib import suppress
 import re
-from typing import Any, Callable, Dict, Optional, List
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    ClassVar,
+    Dict,
+    Optional,
+    List,
+    Tuple,
+)
 import arrow
 from pydantic import BaseModel
+from pydantic_settings import SettingsConfigDict
 from src.models import AData, Subscription
 from src.models.pikpak import PikPakDownloadInfo
-from src.spider.routes.base import BaseSpider, BaseSpiderAData
+from src.spider.routes.base import (
+    BaseSpider,
+    BaseSpiderAData,
+    BaseSpiderStaticConfig,
+)
 from src.utils import convert_size, get_quarter, get_timestamp, timestamp2human
-from src.utils.gpt_tools import find_bangumi_name_cache
+from src.utils.feed import parse_feed
+from src.utils.gpt_tools import find_bangumi_names_cache
 from src.utils.request import Response
-import feedparser
 from email.utils import parsedate_to_datetime
 from difflib import SequenceMatcher
-from config import config
+from config import config, env_config
 
 
 class MikananiRssSpiderAData(BaseSpiderAData):
@@ -56,11 +70,12 @@ class MikananiRssSpiderAData(BaseSpiderAData):
         if similarity.ratio() <= 0.6:
             text += f"<b>{self.title}</b>\n"
         text += f"{self.content}\n\n"
-        if config.gpt_api_key:
-            # AI 番剧名称
+        if config.gpt_api_key or self.bangumi_name_cn or self.bangumi_name_jp:
+            # 识别的番剧名称
             cn = self.bangumi_name_cn if self.bangumi_name_cn else "未知"
             jp = self.bangumi_name_jp if self.bangumi_name_jp else "未知"
-            text += f"AI 识别:\n<code>{cn}</code> - <code>{jp}</code>\n\n"
+            label = "AI 识别" if config.gpt_api_key else "识别"
+            text += f"{label}:\n<code>{cn}</code> - <code>{jp}</code>\n\n"
         # 磁力链接
         if self.magnet_url:
             text += f"<code>{self.magnet_url}</code>\n"
@@ -94,6 +109,24 @@ class MikananiRssSpiderAData(BaseSpiderAData):
         )
 
 
+class MikananiRssSpiderStaticConfig(BaseSpiderStaticConfig):
+    """
+    静态配置
+    """
+
+    model_config = SettingsConfigDict(
+        env_file=f".env.{env_config.env}",
+        env_file_encoding="utf-8",
+        env_prefix="MIKANANI_RSS_SPIDER_",
+        extra="allow",
+    )
+
+    parser: str = "feedparser"
+    """
+    解析引擎: feedparser, etree or lxml
+    """
+
+
 class MikananiRssSpider(BaseSpider):
     """
     Spider 模型
@@ -120,32 +153,58 @@ class MikananiRssSpider(BaseSpider):
     唯一id 前缀
     """
 
-    async def parse(
+    static_config: Optional[MikananiRssSpiderStaticConfig] = (
+        MikananiRssSpiderStaticConfig()
+    )
+    """
+    静态配置
+    """
+
+    extend_fields: ClassVar[List[str]] = ["id"]
+    """
+    保留到 extend 的原始字段
+    """
+
+    async def parse_entries(
         self, subscription: Subscription, response: Response
-    ) -> Optional[List[MikananiRssSpiderAData]]:
+    ) -> AsyncIterator[Tuple[dict, dict]]:
         """
-        解析数据
+        解析原始条目, 返回 (feed, entry)
         """
-        result = []
-        d = feedparser.parse(response.content)
-        if d.get("feed"):
-            for entry in d["entries"]:
-                torrent_url = get_torrent_url(entry)
-                adata = MikananiRssSpiderAData(
-                    id=self.get_only_id(entry.get("link", entry.get("title"))),
-                    title=entry["title"],
-                    content=entry["summary"],
-                    url=entry.get("link", None),
-                    source=d["feed"]["title"],
-                    push_time=await handle_date(entry),
-                    extend=entry,
-                    content_length=int(entry.get("contentlength", 0)),
-                    torrent_url=torrent_url,
-                    magnet_url=torrent_url2magnet_url(torrent_url),
-                )
-
-                result.append(adata)
-        return result
+        feed, entries = parse_feed(
+            response.content,
+            self.static_config.parser,
+            response.headers.get("content-type"),
+        )
+        if feed:
+            for entry in entries:
+                yield feed, entry
+
+    def entry_id(self, raw: Tuple[dict, dict]) -> str:
+        _, entry = raw
+        return self.get_only_id(entry.get("link", entry.get("title")))
+
+    def entry_text(self, raw: Tuple[dict, dict]) -> Tuple[Optional[str], Optional[str]]:
+        _, entry = raw
+        return entry.get("title"), entry.get("summary")
+
+    async def build_adata(
+        self, subscription: Subscription, raw: Tuple[dict, dict]
+    ) -> MikananiRssSpiderAData:
+        feed, entry = raw
+        torrent_url = get_torrent_url(entry)
+        return MikananiRssSpiderAData(
+            id=self.entry_id(raw),
+            title=entry["title"],
+            content=entry["summary"],
+            url=entry.get("link", None),
+            source=feed["title"],
+            push_time=await handle_date(entry),
+            extend=self.project_extend(entry),
+            content_length=int(entry.get("contentlength", 0)),
+            torrent_url=torrent_url,
+            magnet_url=torrent_url2magnet_url(torrent_url),
+        )
 
     async def handle_new_adata(
         self, adatas: List[MikananiRssSpiderAData], subscription: Subscription
@@ -153,13 +212,12 @@ class MikananiRssSpider(BaseSpider):
         """
         处理数据
         """
-        if config.gpt_api_key:
-            for adata in adatas:
-                bangumi = await find_bangumi_name_cache(adata.title)
-                adata.bangumi_name_cn = bangumi.get("cn", None)
-                adata.bangumi_name_jp = bangumi.get("jp", None)
-        else:
-            for adata in adatas:
+        # 本地解析标题, 配置了 chatgpt 时置信度低的标题再交给 chatgpt 识别
+        bangumis = await find_bangumi_names_cache([adata.title for adata in adatas])
+        for adata, bangumi in zip(adatas, bangumis):
+            adata.bangumi_name_cn = bangumi.get("cn", None)
+            adata.bangumi_name_jp = bangumi.get("jp", None)
+            if not config.gpt_api_key:
                 adata.deflaut_path = subscription.name
         return adatas
 
@@ -3,17 +3,32 @@ Spider部分
 """
 
 from contextlib import suppress
-from typing import Any, Callable, Dict, Optional, List
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    ClassVar,
+    Dict,
+    Optional,
+    List,
+    Tuple,
+)
 import arrow
 from pydantic import BaseModel
+from pydantic_settings import SettingsConfigDict
+from loguru import logger
 from src.models import AData, Subscription
-from src.spider.routes.base import BaseSpider, BaseSpiderAData
+from src.spider.routes.base import (
+    BaseSpider,
+    BaseSpiderAData,
+    BaseSpiderStaticConfig,
+)
 from src.utils import get_timestamp, timestamp2human
-from src.utils.request import get, Response
-import feedparser
+from src.utils.feed import iter_feed_stream, parse_feed
+from src.utils.request import get, get_stream, Response
 from email.utils import parsedate_to_datetime
 from difflib import SequenceMatcher
-from config import config
+from config import config, env_config
 
 
 class RssSpiderAData(BaseSpiderAData):
@@ -44,6 +59,29 @@ class RssSpiderAData(BaseSpiderAData):
         }
 
 
+class RssSpiderStaticConfig(BaseSpiderStaticConfig):
+    """
+    静态配置
+    """
+
+    model_config = SettingsConfigDict(
+        env_file=f".env.{env_config.env}",
+        env_file_encoding="utf-8",
+        env_prefix="RSS_SPIDER_",
+        extra="allow",
+    )
+
+    parser: str = "feedparser"
+    """
+    解析引擎: feedparser, etree or lxml
+    """
+
+    stream_parse: bool = False
+    """
+    流式解析, 边下载边解析, 遇到已读条目即停止, 适合按时间倒序的大体积订阅
+    """
+
+
 class RssSpider(BaseSpider):
     """
     Spider 模型
@@ -69,29 +107,82 @@ class RssSpider(BaseSpider):
     唯一id 前缀
     """
 
-    async def parse(
+    static_config: Optional[RssSpiderStaticConfig] = RssSpiderStaticConfig()
+    """
+    静态配置
+    """
+
+    extend_fields: ClassVar[List[str]] = ["id", "author", "tags"]
+    """
+    保留到 extend 的原始字段
+    """
+
+    async def request(self, subscription: Subscription) -> Optional[Response]:
+        """
+        请求数据, 流式解析时只读取响应头
+        """
+        if not self.static_config.stream_parse:
+            return await super().request(subscription)
+        proxy = None
+        if subscription.enable_proxy:
+            proxy = config.proxy
+        url = subscription.spider.dynamic_config.url
+        try:
+            return await get_stream(
+                url,
+                headers=self.get_conditional_headers(subscription, url),
+                proxy=proxy,
+            )
+        except Exception as e:
+            logger.error(f"Spider {self.name} request error: {e}")
+            return None
+
+    def stop_on_seen(self, subscription: Subscription) -> bool:
+        return self.static_config.stream_parse
+
+    async def parse_entries(
         self, subscription: Subscription, response: Response
-    ) -> Optional[List[RssSpiderAData]]:
+    ) -> AsyncIterator[Tuple[dict, dict]]:
         """
-        解析数据
+        解析原始条目, 返回 (feed, entry)
         """
-        result = []
-        d = feedparser.parse(response.content)
-        if d.get("feed"):
-            for entry in d["entries"]:
-                adata = RssSpiderAData(
-                    id=self.get_only_id(
-                        entry.get("guid ", entry.get("link", entry.get("title")))
-                    ),
-                    title=entry["title"],
-                    content=entry["summary"],
-                    url=entry.get("link", None),
-                    source=d["feed"]["title"],
-                    push_time=await handle_date(entry),
-                    extend=entry,
-                )
-                result.append(adata)
-        return result
+        content_type = response.headers.get("content-type")
+        if response.stream is not None:
+            async for item in iter_feed_stream(
+                response.stream.aiter_bytes(), content_type
+            ):
+                yield item
+            return
+        feed, entries = parse_feed(
+            response.content, self.static_config.parser, content_type
+        )
+        if feed:
+            for entry in entries:
+                yield feed, entry
+
+    def entry_id(self, raw: Tuple[dict, dict]) -> str:
+        _, entry = raw
+        return self.get_only_id(
+            entry.get("guid ", entry.get("link", entry.get("title")))
+        )
+
+    def entry_text(self, raw: Tuple[dict, dict]) -> Tuple[Optional[str], Optional[str]]:
+        _, entry = raw
+        return entry.get("title"), entry.get("summary")
+
+    async def build_adata(
+        self, subscription: Subscription, raw: Tuple[dict, dict]
+    ) -> RssSpiderAData:
+        feed, entry = raw
+        return RssSpiderAData(
+            id=self.entry_id(raw),
+            title=entry["title"],
+            content=entry["summary"],
+            url=entry.get("link", None),
+            source=feed["title"],
+            push_time=await handle_date(entry),
+            extend=self.project_extend(entry),
+        )
 
 
 def get_item_date(item: Dict[str, Any]) -> arrow.Arrow:
@@ -2,8 +2,7 @@
 Spider部分
 """
 
-import json
-from typing import Optional, List
+from typing import AsyncIterator, ClassVar, Optional, List, Tuple
 from src.models import Subscription
 from src.spider.routes.base import BaseSpider, BaseSpiderAData
 from src.utils import timestamp2human
@@ -56,34 +55,50 @@ class TwitterSpider(BaseSpider):
     唯一id 前缀
     """
 
-    async def parse(
+    extend_fields: ClassVar[List[str]] = [
+        "id_str",
+        "lang",
+        "user.screen_name",
+        "user.name",
+    ]
+    """
+    保留到 extend 的原始字段
+    """
+
+    async def parse_entries(
         self, subscription: Subscription, response: Response
-    ) -> Optional[List[TwitterSpiderAData]]:
+    ) -> AsyncIterator[dict]:
         """
-        解析数据
+        解析原始推文
         """
-        result = []
-        d = json.loads(response.content)
-        if items := d:
-            for item in items:
-                pic_url = []
-                if media := item.get("entities", {}).get("media", []):
-                    for m in media:
-                        if m.get("type") == "photo" and m.get("media_url_https"):
-                            pic_url.append(m.get("media_url_https"))
-
-                adata = TwitterSpiderAData(
-                    id=self.get_only_id(item.get("id")),
-                    title=item.get("full_text"),
-                    content=item.get("full_text"),
-                    url=f"https://twitter.com/{item.get('user',{}).get('screen_name')}/status/{item.get('id')}",
-                    source=f"Twitter - <a href='https://twitter.com/{item.get('user',{}).get('screen_name')}'>{item.get('user',{}).get('name')}</a>",
-                    push_time=twitter_id_to_timestamp(item.get("id")),
-                    extend=item,
-                    pic_url=pic_url,
-                )
-                result.append(adata)
-        return result
+        for item in response.json() or []:
+            yield item
+
+    def entry_id(self, item: dict) -> str:
+        return self.get_only_id(item.get("id"))
+
+    def entry_text(self, item: dict) -> Tuple[Optional[str], Optional[str]]:
+        return item.get("full_text"), item.get("full_text")
+
+    async def build_adata(
+        self, subscription: Subscription, item: dict
+    ) -> TwitterSpiderAData:
+        pic_url = []
+        if media := item.get("entities", {}).get("media", []):
+            for m in media:
+                if m.get("type") == "photo" and m.get("media_url_https"):
+                    pic_url.append(m.get("media_url_https"))
+
+        return TwitterSpiderAData(
+            id=self.entry_id(item),
+            title=item.get("full_text"),
+            content=item.get("full_text"),
+            url=f"https://twitter.com/{item.get('user',{}).get('screen_name')}/status/{item.get('id')}",
+            source=f"Twitter - <a href='https://twitter.com/{item.get('user',{}).get('screen_name')}'>{item.get('user',{}).get('name')}</a>",
+            push_time=twitter_id_to_timestamp(item.get("id")),
+            extend=self.project_extend(item),
+            pic_url=pic_url,
+        )
 
 
 # 推特id转时间戳
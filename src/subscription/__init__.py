@@ -3,11 +3,29 @@
 读取订阅文件，将订阅加入执行队列
 """
 
+import asyncio
+
 from loguru import logger
 from src.database import load_subscriptions
+from src.database.retention import compact_subscriptions
+from src.database.seen import load_seen_indexes
 from config import config
-from src.subscription.scheduler import start_scheduler
+from src.subscription.delivery import drain_outbox
+from src.subscription.scheduler import add_cron_job, start_scheduler
+
+
+async def drain_pending_actions():
+    """
+    重新投递发件箱中到期的记录
+    """
+    await drain_outbox(await load_subscriptions())
 
 
 async def start_subscription():
-    await start_scheduler(await load_subscriptions())
+    subscriptions = await load_subscriptions()
+    await load_seen_indexes([subscription.name for subscription in subscriptions])
+    await start_scheduler(subscriptions)
+    add_cron_job(compact_subscriptions, config.retention_cron, "__retention__")
+    # 投递上次退出前未完成的记录
+    add_cron_job(drain_pending_actions, config.outbox_cron, "__outbox__")
+    asyncio.create_task(drain_pending_actions())
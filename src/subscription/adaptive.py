@@ -0,0 +1,126 @@
+"""
+自适应抓取频率
+根据订阅新数据的到达间隔, 在 cron 间隔和 cron 间隔 * adaptive_max_factor 之间调整实际抓取间隔
+cron 照常触发, 需要延长间隔时直接跳过本次触发
+"""
+
+import datetime
+from typing import Dict, Optional
+
+from loguru import logger
+
+from config import config
+from src.models import Subscription
+from src.utils import create_trigger, get_timestamp
+
+# 到达间隔的平滑系数
+EWMA_ALPHA = 0.3
+
+
+class AdaptiveState:
+    """
+    单个订阅的自适应状态
+    """
+
+    def __init__(self):
+        self.cron: Optional[str] = None
+        self.cron_interval: Optional[int] = None
+        """
+        cron 间隔, 毫秒
+        """
+        self.last_new_time: Optional[int] = None
+        """
+        上次发现新数据的时间, 毫秒
+        """
+        self.arrival_interval: Optional[float] = None
+        """
+        新数据平均到达间隔, 毫秒
+        """
+        self.idle_polls = 0
+        """
+        连续没有新数据的次数
+        """
+        self.skip = 0
+        """
+        剩余需要跳过的触发次数
+        """
+
+
+ADAPTIVE_STATES: Dict[str, AdaptiveState] = {}
+
+
+def get_cron_interval(cron: str) -> Optional[int]:
+    """
+    根据相邻两次触发时间估算 cron 间隔, 毫秒
+    """
+    trigger = create_trigger(cron)
+    if trigger is None:
+        return None
+    now = datetime.datetime.now(trigger.timezone)
+    first = trigger.get_next_fire_time(None, now)
+    if first is None:
+        return None
+    second = trigger.get_next_fire_time(first, first + datetime.timedelta(seconds=1))
+    if second is None:
+        return None
+    return int((second - first).total_seconds() * 1000)
+
+
+def get_state(subscription: Subscription) -> AdaptiveState:
+    state = ADAPTIVE_STATES.setdefault(subscription.name, AdaptiveState())
+    if state.cron != subscription.cron:
+        state.cron = subscription.cron
+        state.cron_interval = get_cron_interval(subscription.cron)
+        state.skip = 0
+    return state
+
+
+def adaptive_skip(subscription: Subscription) -> bool:
+    """
+    本次触发是否跳过
+    """
+    state = get_state(subscription)
+    if state.skip > 0:
+        state.skip -= 1
+        return True
+    return False
+
+
+def record_adaptive_result(subscription: Subscription, new_count: int) -> None:
+    """
+    记录本次抓取结果, 计算之后需要跳过的触发次数
+    """
+    state = get_state(subscription)
+    if not state.cron_interval:
+        return
+    now = get_timestamp()
+    if new_count:
+        if state.last_new_time:
+            interval = now - state.last_new_time
+            if state.arrival_interval is None:
+                state.arrival_interval = interval
+            else:
+                state.arrival_interval = (
+                    EWMA_ALPHA * interval + (1 - EWMA_ALPHA) * state.arrival_interval
+                )
+        state.last_new_time = now
+        state.idle_polls = 0
+    else:
+        state.idle_polls += 1
+
+    # 按到达间隔的一半抓取, 没有新数据时逐渐延长
+    wait = state.cron_interval
+    if state.arrival_interval:
+        wait = max(wait, state.arrival_interval / 2)
+    wait = max(wait, state.cron_interval * (1 + state.idle_polls))
+    wait = min(wait, state.cron_interval * max(config.adaptive_max_factor, 1))
+    state.skip = int(wait // state.cron_interval) - 1
+    if state.skip:
+        logger.debug(f"自适应抓取: {subscription.name}, 跳过 {state.skip} 次")
+
+
+def drop_adaptive_state(name: str) -> None:
+    """
+    删除订阅的自适应状态
+    """
+    ADAPTIVE_STATES.pop(name, None)
@@ -3,21 +3,26 @@
 读取订阅文件，将订阅加入执行队列
 """
 
-import asyncio
-
 from loguru import logger
 from src.models import Subscription
+from src.subscription.delivery import drain_subscription
+from src.subscription.adaptive import adaptive_skip, record_adaptive_result
+from src.subscription.limiter import fetch_limit
 
 
 async def check_subscription(subscription: Subscription):
     """
     检查订阅是否更新
     """
+    if subscription.adaptive and adaptive_skip(subscription):
+        logger.debug(f"自适应跳过: {subscription.name}")
+        return
     logger.debug(f"检查订阅: {subscription.name}")
-    new_adatas = await subscription.spider.start(subscription)
+    async with fetch_limit(subscription):
+        new_adatas = await subscription.spider.start(subscription)
+    if subscription.adaptive:
+        record_adaptive_result(subscription, len(new_adatas or []))
     if new_adatas:
-        tasks = []
-        for action in subscription.actions:
-            if action.name in subscription.spider.support_actions:
-                tasks.append(action.execute(new_adatas, subscription))
-        asyncio.gather(*tasks)
+        # 新数据已在 Spider 中写入发件箱
+        # 等待执行完成, 同一订阅的下次触发不会和本次的 Action 叠加
+        await drain_subscription(subscription)
@@ -0,0 +1,109 @@
+"""
+Action 投递
+Spider 把新数据写入发件箱后才标记为已读, 这里把发件箱中的记录交给 Action 调度器执行
+每个 Action 成功后确认, 失败重试
+"""
+
+import asyncio
+from typing import Dict, List, Tuple
+
+from loguru import logger
+
+from config import config
+from src.database.outbox import OutboxEntry, outbox
+from src.models import Subscription
+from src.subscription.dispatch import dispatcher
+
+
+async def renew_lease(ids: List[int], lease: int) -> None:
+    """
+    每隔三分之一租期续期一次, 直到被取消
+    """
+    while True:
+        await asyncio.sleep(lease / 1000 / 3)
+        try:
+            await outbox.renew(ids, lease)
+        except Exception as e:
+            logger.error(f"发件箱续期失败: {e}")
+
+
+async def submit_entries(
+    subscription: Subscription, entries: List[OutboxEntry]
+) -> List[Tuple[List[OutboxEntry], asyncio.Future]]:
+    """
+    按 Action 分组提交到调度器, 返回 (记录, 执行结果) 列表
+    """
+    groups: Dict[str, List[OutboxEntry]] = {}
+    for entry in entries:
+        groups.setdefault(entry.action, []).append(entry)
+
+    jobs = []
+    for name, group in groups.items():
+        action = next((a for a in subscription.actions if a.name == name), None)
+        if action is None:
+            # Action 已被删除
+            await outbox.ack([entry.id for entry in group])
+            continue
+        future = await dispatcher.submit(
+            action, [entry.adata for entry in group], subscription
+        )
+        jobs.append((group, future))
+    return jobs
+
+
+async def drain_subscription(subscription: Subscription) -> None:
+    """
+    分批投递订阅在发件箱中到期的记录
+    """
+    # 租期内其他投递不会取到同一批记录, 排队和执行期间定时续期
+    lease = int((config.action_timeout + 60) * 1000)
+    while True:
+        entries = await outbox.claim(subscription.name, config.outbox_batch_size, lease)
+        if not entries:
+            return
+        renewal = asyncio.create_task(
+            renew_lease([entry.id for entry in entries], lease)
+        )
+        try:
+            jobs = await submit_entries(subscription, entries)
+            results = await asyncio.gather(
+                *[future for _, future in jobs], return_exceptions=True
+            )
+        finally:
+            # 先停止续期, 避免覆盖 retry 设置的下次投递时间
+            renewal.cancel()
+            await asyncio.gather(renewal, return_exceptions=True)
+        for (group, _), result in zip(jobs, results):
+            ids = [entry.id for entry in group]
+            if not isinstance(result, BaseException):
+                await outbox.ack(ids)
+                continue
+            attempts = max(entry.attempts for entry in group) + 1
+            if attempts >= config.outbox_max_attempts:
+                logger.error(
+                    f"投递失败次数过多, 丢弃: {subscription.name} - {group[0].action}, "
+                    f"{len(ids)} 条"
+                )
+                await outbox.ack(ids)
+            else:
+                await outbox.retry(ids, attempts)
+
+        if len(entries) < config.outbox_batch_size:
+            return
+
+
+async def drain_outbox(subscriptions: List[Subscription]) -> None:
+    """
+    投递发件箱中所有到期的记录, 启动时和定时执行
+    """
+    subs = {subscription.name: subscription for subscription in subscriptions}
+    for name in await outbox.pending_subscriptions():
+        subscription = subs.get(name)
+        if subscription is None:
+            # 订阅已被删除
+            await outbox.drop_subscription(name)
+            continue
+        try:
+            await drain_subscription(subscription)
+        except Exception as e:
+            logger.error(f"发件箱投递失败: {name}, {e}")
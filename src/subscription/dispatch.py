@@ -0,0 +1,140 @@
+"""
+Action 执行队列
+有界队列 + 固定数量的 worker, 队列满时提交方等待, 订阅任务因此不会无限堆积
+"""
+
+import asyncio
+import time
+from typing import Any, List, Optional
+
+from loguru import logger
+
+from config import config
+from src.models import AData, Subscription
+
+
+class ActionJob:
+    """
+    一次 Action 执行
+    """
+
+    def __init__(self, action: Any, adatas: List[AData], subscription: Subscription):
+        self.action = action
+        self.adatas = adatas
+        self.subscription = subscription
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueue_time = time.perf_counter()
+
+
+class ActionDispatcher:
+    """
+    Action 调度器
+    """
+
+    def __init__(self):
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.total_wait = 0.0
+
+    def start(self) -> None:
+        """
+        启动 worker
+        """
+        if self.queue is not None:
+            return
+        self.queue = asyncio.Queue(maxsize=max(config.action_queue_size, 1))
+        for i in range(max(config.action_workers, 1)):
+            self.workers.append(asyncio.create_task(self._worker(i)))
+        logger.debug(f"Action 调度器启动, worker 数量: {len(self.workers)}")
+
+    async def stop(self) -> None:
+        """
+        停止 worker, 未执行的任务取消
+        """
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        if self.queue is not None:
+            while not self.queue.empty():
+                self.queue.get_nowait().future.cancel()
+        self.queue = None
+
+    async def submit(
+        self, action: Any, adatas: List[AData], subscription: Subscription
+    ) -> asyncio.Future:
+        """
+        提交 Action, 队列满时等待, 返回执行结果的 future
+        """
+        self.start()
+        job = ActionJob(action, adatas, subscription)
+        await self.queue.put(job)
+        return job.future
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job: ActionJob = await self.queue.get()
+            if job.future.cancelled():
+                self.queue.task_done()
+                continue
+            self.total_wait += time.perf_counter() - job.enqueue_time
+            self.in_flight += 1
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(
+                    job.action.execute(job.adatas, job.subscription),
+                    timeout=config.action_timeout,
+                )
+                self.completed += 1
+                if not job.future.done():
+                    job.future.set_result(None)
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            except asyncio.TimeoutError as e:
+                self.timeouts += 1
+                self.failed += 1
+                logger.error(
+                    f"Action 执行超时: {job.subscription.name} - {job.action.name}"
+                )
+                if not job.future.done():
+                    job.future.set_exception(e)
+            except Exception as e:
+                self.failed += 1
+                logger.error(
+                    f"Action 执行失败: {job.subscription.name} - {job.action.name}, {e}"
+                )
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                latency = time.perf_counter() - start
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+                self.in_flight -= 1
+                self.queue.task_done()
+
+    def metrics(self) -> dict:
+        """
+        队列指标, 时间单位毫秒
+        """
+        done = self.completed + self.failed
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "in_flight": self.in_flight,
+            "workers": len(self.workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "avg_latency": round(self.total_latency / done * 1000, 2) if done else 0,
+            "max_latency": round(self.max_latency * 1000, 2),
+            "avg_wait": round(self.total_wait / done * 1000, 2) if done else 0,
+        }
+
+
+dispatcher = ActionDispatcher()
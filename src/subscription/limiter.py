@@ -0,0 +1,50 @@
+"""
+抓取并发限制
+全局并发上限 + 每个域名的并发上限
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlparse
+
+from config import config
+from src.models import Subscription
+
+_global_semaphore: Optional[asyncio.Semaphore] = None
+
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def get_subscription_host(subscription: Subscription) -> Optional[str]:
+    """
+    获取订阅 url 的域名, 没有 url 的返回 None
+    """
+    url = getattr(getattr(subscription.spider, "dynamic_config", None), "url", None)
+    if not url:
+        return None
+    return urlparse(url).hostname
+
+
+@asynccontextmanager
+async def fetch_limit(subscription: Subscription) -> AsyncIterator[None]:
+    """
+    抓取时占用全局和域名的并发名额
+    """
+    global _global_semaphore
+    if _global_semaphore is None:
+        _global_semaphore = asyncio.Semaphore(max(config.fetch_concurrency, 1))
+    host = get_subscription_host(subscription)
+    host_semaphore = None
+    if host:
+        host_semaphore = _host_semaphores.setdefault(
+            host, asyncio.Semaphore(max(config.fetch_per_host_concurrency, 1))
+        )
+    # 先占用域名名额, 等待同域名时不占用全局名额
+    if host_semaphore is None:
+        async with _global_semaphore:
+            yield
+        return
+    async with host_semaphore:
+        async with _global_semaphore:
+            yield
@@ -5,12 +5,14 @@
 
 import asyncio
 import datetime
+import random
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from typing import List, Optional
 
 from loguru import logger
 from src.models import Subscription
 from config import config
+from src.subscription.adaptive import drop_adaptive_state
 from src.subscription.check import check_subscription
 from src.utils import create_trigger
 import functools
@@ -21,34 +23,49 @@ import inspect
 scheduler = AsyncIOScheduler()
 
 
-def add_job(subscription: Subscription):
+def add_job(subscription: Subscription, start_spread: float = 0):
     """
     添加任务
+    start_spread: 首次运行在 1 秒后再随机延后的最长秒数
     """
 
-    # 通过 cron 表达式添加任务
-    trigger = create_trigger(subscription.cron)
+    # 通过 cron 表达式添加任务, 随机延后避免同时触发
+    trigger = create_trigger(subscription.cron, jitter=config.fetch_jitter)
     if trigger is None:
         logger.error(f"cron表达式错误: {subscription}")
         return
+    delay = 1 + random.uniform(0, start_spread)
     scheduler.add_job(
         check_subscription,
         trigger=trigger,
         args=(subscription,),
         id=subscription.name,
         misfire_grace_time=3,
-        next_run_time=datetime.datetime.now() + datetime.timedelta(seconds=1),
+        next_run_time=datetime.datetime.now() + datetime.timedelta(seconds=delay),
     )
     logger.info(f"定时任务添加成功: {subscription.name}")
 
 
+def add_cron_job(func, cron: str, job_id: str):
+    """
+    添加后台定时任务, 如历史数据压缩
+    """
+    trigger = create_trigger(cron)
+    if trigger is None:
+        logger.error(f"cron表达式错误: {job_id}, {cron}")
+        return
+    scheduler.add_job(func, trigger=trigger, id=job_id, replace_existing=True)
+    logger.info(f"后台任务添加成功: {job_id}")
+
+
 def add_jobs(subscriptions: List[Subscription]):
     """
     添加任务
     """
     for subscription in subscriptions:
         if subscription.enable:
-            add_job(subscription)
+            # 首次运行分散开, 避免启动时所有订阅同时抓取
+            add_job(subscription, config.fetch_start_spread)
             logger.debug(f"添加任务: {subscription.name}")
 
 
@@ -61,6 +78,7 @@ def remove_job(subscription: Subscription):
         if scheduler.get_job(subscription.name):
             scheduler.remove_job(subscription.name)
             logger.debug(f"移除任务: {subscription.name}")
+        drop_adaptive_state(subscription.name)
     except Exception as e:
         logger.error(f"移除任务失败: {subscription.name}, {e}")
 
@@ -19,7 +19,7 @@ def timestamp2human(timestamp: int) -> str:
     return arrow.get(timestamp).to("Asia/Shanghai").format("YYYY-MM-DD HH:mm:ss")
 
 
-def create_trigger(cron: str) -> Optional[CronTrigger]:
+def create_trigger(cron: str, jitter: Optional[int] = None) -> Optional[CronTrigger]:
     try:
         times_list = cron.split(" ")
         # 制作一个触发器
@@ -31,6 +31,7 @@ def create_trigger(cron: str) -> Optional[CronTrigger]:
             month=times_list[4],
             day_of_week=times_list[5],
             timezone="Asia/Shanghai",
+            jitter=jitter or None,
         )
         return trigger
     except Exception:
@@ -0,0 +1,85 @@
+"""
+原子写文件
+先写入同目录的临时文件并 fsync, 再用 os.replace 替换目标文件, 写入中途退出不会留下不完整的文件
+同一路径的写入通过 asyncio.Lock 串行执行
+"""
+
+import asyncio
+import functools
+import os
+import tempfile
+from typing import Dict, Union
+
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+def backup_path(path: str) -> str:
+    """
+    备份文件路径
+    """
+    return f"{path}.bak"
+
+
+def get_path_lock(path: str) -> asyncio.Lock:
+    """
+    获取路径对应的写入锁
+    """
+    return _locks.setdefault(os.path.abspath(path), asyncio.Lock())
+
+
+def _fsync_dir(path: str) -> None:
+    # windows 不支持打开目录
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_file(path: str, data: Union[str, bytes], backup: bool = False) -> None:
+    """
+    同步原子写入
+    backup: 替换前把旧文件保留为 {path}.bak
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if backup and os.path.isfile(path):
+            # 硬链接保留旧文件, 不支持时复制
+            bak = backup_path(path)
+            if os.path.lexists(bak):
+                os.remove(bak)
+            try:
+                os.link(path, bak)
+            except OSError:
+                with open(path, "rb") as src, open(bak, "wb") as dst:
+                    dst.write(src.read())
+        os.replace(tmp_path, path)
+        _fsync_dir(directory)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+async def atomic_write(path: str, data: Union[str, bytes], backup: bool = False) -> None:
+    """
+    原子写入, 在线程池中执行, 同一路径串行
+    """
+    loop = asyncio.get_running_loop()
+    async with get_path_lock(path):
+        await loop.run_in_executor(
+            None, functools.partial(write_file, path, data, backup)
+        )
+
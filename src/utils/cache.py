@@ -1,9 +1,10 @@
-import json
 import os
 from typing import Any
 import aiofiles
 
 from config import config
+from src.utils.atomic import atomic_write
+from src.utils.serialize import dumps, loads
 
 if not os.path.exists(config.data_path):
     os.mkdir(config.data_path)
@@ -23,18 +24,15 @@ async def read_cache(key: str) -> Any:
             encoding="utf-8",
         ) as f:
             bangumi_name_cache = await f.read()
-        return json.loads(bangumi_name_cache)
+        return loads(bangumi_name_cache)
     except Exception as e:
         return None
 
 
 async def write_cache(key: str, data: Any) -> None:
     """
-    写入缓存
+    写入缓存, 原子写入
     """
-    async with aiofiles.open(
-        os.path.join(config.data_path, "cache", f"{key}.json"),
-        mode="w",
-        encoding="utf-8",
-    ) as f:
-        await f.write(json.dumps(data, ensure_ascii=False, indent=4))
+    await atomic_write(
+        os.path.join(config.data_path, "cache", f"{key}.json"), dumps(data)
+    )
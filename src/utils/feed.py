@@ -0,0 +1,360 @@
+"""
+RSS / Atom 解析
+可选解析引擎: feedparser (默认), etree (标准库 ElementTree), lxml (需要安装 lxml)
+etree / lxml 返回与 feedparser 字段名一致的 entry, summary / content 使用 feedparser 的 HTML 清理
+与 feedparser 的区别: 不做日期标准化 (没有 *_parsed 字段), 不把相对链接转换为绝对链接
+流式解析边下载边解析, 每解析完一个条目就返回, 已解析的条目从文档树中移除, 不保留完整文档
+响应头 Content-Type 中的 charset 优先于 xml 声明中的编码, 与 feedparser 一致
+"""
+
+import codecs
+import io
+import re
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+
+import feedparser
+from loguru import logger
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+# feedparser 没有公开的 HTML 清理接口, 使用内部函数保证结果一致
+# 新版本中不存在时 etree / lxml 不可用, 全部使用 feedparser 解析, 不返回未清理的 HTML
+try:
+    from feedparser.sanitizer import _sanitize_html
+except ImportError:
+    _sanitize_html = None
+
+# 不需要清理 HTML 的内容类型, Atom 的 type="text"
+PLAIN_TYPES = {"text", "text/plain"}
+
+# Content-Type 中的 charset 参数
+CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+
+# 条目标签, RSS 为 item, Atom 为 entry
+ENTRY_TAGS = {"item", "entry"}
+# 频道标签, RSS 为 channel, Atom 为 feed
+FEED_TAGS = {"channel", "feed"}
+
+
+def local_name(tag: str) -> str:
+    """
+    去掉命名空间, {http://www.w3.org/2005/Atom}entry -> entry
+    """
+    return tag.rsplit("}", 1)[-1]
+
+
+def element_text(element: ElementTree.Element) -> str:
+    """
+    元素文本, 包含子元素时保留子元素的标签
+    """
+    text = element.text or ""
+    for child in element:
+        if isinstance(child, ElementTree.Element):
+            text += ElementTree.tostring(child, encoding="unicode")
+        else:
+            text += lxml_etree.tostring(child, encoding="unicode")
+    return text.strip()
+
+
+def html_text(element: Any) -> str:
+    """
+    summary / content 的文本, 和 feedparser 一样清理 HTML (去掉 script、事件属性等)
+    """
+    text = element_text(element)
+    if element.get("type", "html") in PLAIN_TYPES:
+        return text
+    if _sanitize_html is None:
+        raise RuntimeError("feedparser 中没有 HTML 清理函数")
+    if "<" not in text and "&" not in text:
+        return text
+    return _sanitize_html(text, "utf-8", "text/html")
+
+
+def parse_entry_children(
+    element: Any, entry: Dict[str, Any], links: List[Dict[str, str]]
+) -> None:
+    """
+    解析条目的子元素, 未知的嵌套元素 (如 mikan 的 torrent) 展开后继续解析
+    同名字段保留第一个
+    """
+    for child in element:
+        # lxml 中注释和处理指令的 tag 不是字符串
+        if not isinstance(child.tag, str):
+            continue
+        name = local_name(child.tag)
+        if name == "title":
+            entry.setdefault("title", element_text(child))
+        elif name == "link":
+            href = child.get("href")
+            if href is None:
+                href = element_text(child)
+                links.append({"rel": "alternate", "type": "text/html", "href": href})
+            else:
+                links.append(
+                    {
+                        "rel": child.get("rel", "alternate"),
+                        "type": child.get("type", "text/html"),
+                        "href": href,
+                    }
+                )
+        elif name == "enclosure":
+            links.append(
+                {
+                    "type": child.get("type", ""),
+                    "length": child.get("length", ""),
+                    "href": child.get("url", ""),
+                    "rel": "enclosure",
+                }
+            )
+        elif name in ("guid", "id"):
+            entry.setdefault("id", element_text(child))
+            entry.setdefault("guidislink", child.get("isPermaLink", "true") != "false")
+        elif name in ("description", "summary"):
+            entry.setdefault("summary", html_text(child))
+        elif name in ("encoded", "content"):
+            entry.setdefault("content", [{"value": html_text(child)}])
+        elif name in ("pubDate", "published", "issued"):
+            entry.setdefault("published", element_text(child))
+        elif name in ("updated", "modified", "date"):
+            entry.setdefault("updated", element_text(child))
+        elif name in ("author", "creator"):
+            author = child.find("{*}name")
+            entry.setdefault(
+                "author", element_text(author if author is not None else child)
+            )
+        elif name == "category":
+            entry.setdefault("tags", []).append(
+                {"term": child.get("term") or element_text(child)}
+            )
+        elif len(child):
+            parse_entry_children(child, entry, links)
+        else:
+            entry.setdefault(name.lower(), element_text(child))
+
+
+def parse_entry_element(element: Any) -> Dict[str, Any]:
+    """
+    解析单个条目, 字段名与 feedparser 保持一致
+    支持 ElementTree 和 lxml 的元素
+    """
+    entry: Dict[str, Any] = {}
+    links: List[Dict[str, str]] = []
+    parse_entry_children(element, entry, links)
+    if "summary" not in entry and entry.get("content"):
+        entry["summary"] = entry["content"][0]["value"]
+    for link in links:
+        if link["rel"] == "alternate":
+            entry["link"] = link["href"]
+            break
+    else:
+        # 没有 link 时, 和 feedparser 一样使用永久链接的 guid
+        if entry.get("guidislink") and entry["id"].startswith("http"):
+            entry["link"] = entry["id"]
+    if links:
+        entry["links"] = links
+    return entry
+
+
+def header_charset(content_type: Optional[str]) -> Optional[str]:
+    """
+    响应头 Content-Type 中的编码, 没有时返回 None
+    gb2312 按 gb18030 解码, 与 feedparser 一致
+    """
+    match = CHARSET.search(content_type or "")
+    if match is None:
+        return None
+    charset = match.group(1)
+    return "gb18030" if charset.lower() == "gb2312" else charset
+
+
+def response_headers(content_type: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    传给 feedparser 的响应头
+    """
+    return {"content-type": content_type} if content_type else None
+
+
+def decode_content(content: Any, content_type: Optional[str]) -> Any:
+    """
+    响应头指定了编码时按该编码解码, 解析文本时忽略 xml 声明中的编码
+    """
+    charset = header_charset(content_type)
+    if charset and isinstance(content, bytes):
+        return content.decode(charset)
+    return content
+
+
+class FeedStreamParser:
+    """
+    增量解析器, feed 传入数据块, 返回已经解析完成的条目
+    """
+
+    def __init__(self):
+        self.parser = ElementTree.XMLPullParser(events=("start", "end"))
+        self.stack: List[ElementTree.Element] = []
+        self.feed: Dict[str, Any] = {}
+
+    def feed_bytes(self, data: Any) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        self.parser.feed(data)
+        return self._read_events()
+
+    def close(self) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        self.parser.close()
+        return self._read_events()
+
+    def _read_events(self) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        entries = []
+        for event, element in self.parser.read_events():
+            if event == "start":
+                self.stack.append(element)
+                continue
+            self.stack.pop()
+            name = local_name(element.tag)
+            parent = local_name(self.stack[-1].tag) if self.stack else None
+            if name in ENTRY_TAGS:
+                entries.append((self.feed, parse_entry_element(element)))
+                # 解析完成的条目从文档树中移除
+                element.clear()
+                if self.stack:
+                    self.stack[-1].remove(element)
+            elif parent in FEED_TAGS and name in ("title", "link"):
+                if name == "link" and element.get("href") is not None:
+                    self.feed.setdefault("link", element.get("href"))
+                else:
+                    self.feed.setdefault(name, element_text(element))
+        return entries
+
+
+async def iter_feed_stream(
+    chunks: AsyncIterator[bytes], content_type: Optional[str] = None
+) -> AsyncIterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    从字节流中逐条解析, 返回 (feed, entry)
+    content_type: 响应头 Content-Type, 其中的 charset 优先于 xml 声明
+    XML 不规范 (如 HTML 实体) 或编码不支持时读取剩余内容, 改用 feedparser 解析全文,
+    已经返回过的条目会再返回一次, 由调用方去重复
+    """
+    parser = FeedStreamParser()
+    received: List[bytes] = []
+    try:
+        if _sanitize_html is None:
+            raise RuntimeError("feedparser 中没有 HTML 清理函数")
+        charset = header_charset(content_type)
+        decoder = codecs.getincrementaldecoder(charset)() if charset else None
+        async for chunk in chunks:
+            received.append(chunk)
+            data = decoder.decode(chunk) if decoder else chunk
+            for item in parser.feed_bytes(data):
+                yield item
+        items = parser.feed_bytes(decoder.decode(b"", final=True)) if decoder else []
+        for item in items + parser.close():
+            yield item
+        return
+    except RuntimeError as e:
+        logger.warning(f"无法流式解析, 使用 feedparser 解析全文: {e}")
+    except (ElementTree.ParseError, ValueError, LookupError) as e:
+        logger.debug(f"流式解析失败, 使用 feedparser 解析全文: {e}")
+    async for chunk in chunks:
+        received.append(chunk)
+    d = feedparser.parse(
+        b"".join(received), response_headers=response_headers(content_type)
+    )
+    if d.get("feed"):
+        for entry in d["entries"]:
+            yield d["feed"], entry
+
+
+def parse_with_feedparser(
+    content: Any, content_type: Optional[str] = None
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    d = feedparser.parse(content, response_headers=response_headers(content_type))
+    return d.get("feed") or {}, d["entries"]
+
+
+def parse_with_etree(
+    content: Any, content_type: Optional[str] = None
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    parser = FeedStreamParser()
+    items = parser.feed_bytes(decode_content(content, content_type)) + parser.close()
+    return parser.feed, [entry for _, entry in items]
+
+
+def parse_with_lxml(
+    content: Any, content_type: Optional[str] = None
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    # 已解码的文本按 utf-8 重新编码, 忽略 xml 声明中的编码
+    content = decode_content(content, content_type)
+    encoding = None
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+        encoding = "utf-8"
+    feed: Dict[str, Any] = {}
+    entries = []
+    for _, element in lxml_etree.iterparse(
+        io.BytesIO(content),
+        events=("end",),
+        encoding=encoding,
+        recover=True,
+        resolve_entities=False,
+    ):
+        if not isinstance(element.tag, str):
+            continue
+        name = local_name(element.tag)
+        parent = element.getparent()
+        if name in ENTRY_TAGS:
+            entries.append(parse_entry_element(element))
+            # 解析完成的条目从文档树中移除
+            element.clear()
+            while element.getprevious() is not None:
+                del parent[0]
+        elif (
+            parent is not None
+            and local_name(parent.tag) in FEED_TAGS
+            and name in ("title", "link")
+        ):
+            if name == "link" and element.get("href") is not None:
+                feed.setdefault("link", element.get("href"))
+            else:
+                feed.setdefault(name, element_text(element))
+    return feed, entries
+
+
+# 解析引擎, {名称: 解析函数}, 解析函数传入 (内容, Content-Type), 返回 (feed, entries)
+FEED_PARSERS: Dict[
+    str,
+    Callable[[Any, Optional[str]], Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+] = {
+    "feedparser": parse_with_feedparser,
+    "etree": parse_with_etree,
+    "lxml": parse_with_lxml,
+}
+
+
+def parse_feed(
+    content: Any, engine: str = "feedparser", content_type: Optional[str] = None
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    使用指定引擎解析, 返回 (feed, entries)
+    content_type: 响应头 Content-Type, 其中的 charset 优先于 xml 声明
+    引擎不可用或解析失败时使用 feedparser
+    feedparser 版本变化导致无法和 feedparser 一样清理 HTML 时, etree / lxml 不可用
+    """
+    if engine == "lxml" and lxml_etree is None:
+        logger.warning("未安装 lxml, 使用 etree 解析")
+        engine = "etree"
+    if engine in ("etree", "lxml") and _sanitize_html is None:
+        logger.warning(f"feedparser 中没有 HTML 清理函数, {engine} 改用 feedparser 解析")
+        engine = "feedparser"
+    parse = FEED_PARSERS.get(engine)
+    if parse is None:
+        logger.warning(f"未知的解析引擎: {engine}, 使用 feedparser 解析")
+        parse = parse_with_feedparser
+    try:
+        return parse(content, content_type)
+    except Exception as e:
+        logger.debug(f"{engine} 解析失败, 使用 feedparser 解析: {e}")
+        return parse_with_feedparser(content, content_type)
@@ -1,26 +1,29 @@
+import asyncio
 import json
-from typing import List
+import re
+from typing import Any, Dict, List, Optional
 
-import httpx
 from loguru import logger
 from config import config
 from src.utils.cache import read_cache, write_cache
-from src.utils.request import proxy2httpx
+from src.utils.keyword import AhoCorasick
+from src.utils.release_name import parse_release_name
+from src.utils.request import get_client
 import aiofiles
 import os
 
 
 async def request_gpt(messages: List[dict], model=config.gpt_model) -> dict:
-    async with httpx.AsyncClient(proxies=proxy2httpx(config.proxy)) as client:
-        response = await client.post(
-            f"https://{config.gpt_host}/v1/chat/completions",
-            json={
-                "model": "gpt-4o-mini",
-                "messages": messages,
-            },
-            headers={"Authorization": f"Bearer {config.gpt_api_key}"},
-        )
-        return response.json()
+    client = get_client(config.proxy)
+    response = await client.post(
+        f"https://{config.gpt_host}/v1/chat/completions",
+        json={
+            "model": "gpt-4o-mini",
+            "messages": messages,
+        },
+        headers={"Authorization": f"Bearer {config.gpt_api_key}"},
+    )
+    return response.json()
 
 
 async def find_bangumi_name(text: str) -> dict:
@@ -49,40 +52,310 @@ async def find_bangumi_name(text: str) -> dict:
     return json.loads(response["choices"][0]["message"]["content"])
 
 
-async def find_bangumi_name_cache(text: str) -> dict:
+def parse_gpt_json(content: str):
+    """
+    解析 chatgpt 返回的 json, 去掉可能存在的 markdown 代码块
+    """
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.strip("`")
+        content = content[content.find("\n") + 1 :] if "\n" in content else content
+    return json.loads(content)
+
+
+async def find_bangumi_names(texts: List[str]) -> List[dict]:
+    """
+    通过 chatgpt 批量识别番剧名称, 一次请求多个标题, 按输入顺序返回
     """
-    通过 chatgpt 识别番剧名称, 使用缓存
-    通过 相似度判断是否走缓存
+    system = """
+        input is a json array of titles, for example:
+        ["[Lilith-Raws] AI 电子基因 / AI no Idenshi - 03 [Baha][WebDL 1080p AVC AAC][CHT]", "[ANi] 番剧名称没日文 - 03 [1080P][Baha][WEB-DL][AAC AVC][CHT][MP4]", "unknown"]
+        Only output a json array with the same length and order as input, each item only bangumi cn and jp fields:
+        [{"cn": "AI 电子基因","jp": "AI no Idenshi"}, {"cn": "番剧名称没日文","jp": null}, {"cn": null,"jp": null}]
+        """
+    # 去掉每行前面的空格
+    system = "\n".join([i.strip() for i in system.split("\n")])
+
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": json.dumps(texts, ensure_ascii=False)},
+    ]
+    response = await request_gpt(messages)
+    logger.debug(f"find_bangumi_names chatgpt response: {response}")
+    result = parse_gpt_json(response["choices"][0]["message"]["content"])
+    if not isinstance(result, list) or len(result) != len(texts):
+        raise Exception(f"chatgpt 返回数量不一致: {len(texts)} -> {result}")
+    return [
+        {"cn": item.get("cn"), "jp": item.get("jp")}
+        if isinstance(item, dict)
+        else {"cn": None, "jp": None}
+        for item in result
+    ]
+
+
+class BangumiNameCache:
+    """
+    番剧名称缓存
+    常驻内存, 第一次使用时读取, 所有 cn / jp 名称建立 Aho-Corasick 索引, 一次扫描标题找出所有匹配
+    新增后延迟写入文件, 短时间内多次新增只写一次
     缓存格式:
-    {
-        "cn": "AI 电子基因",
-        "jp": "AI no Idenshi"
-    }
-    """
-    CACHE_KEY = "bangumi_name_cache"
-    if not text:
-        return {"cn": None, "jp": None}
-    bangumi_name_cache = await read_cache(CACHE_KEY) or []
-
-    # 遍历缓存
-    for cache in bangumi_name_cache:
-        cn = cache.get("cn", "")
-        jp = cache.get("jp", "")
-        if not cn and not jp:
+    [
+        {
+            "cn": "AI 电子基因",
+            "jp": "AI no Idenshi"
+        }
+    ]
+    """
+
+    def __init__(self, key: str, flush_delay: float = 5):
+        self.key = key
+        self.flush_delay = flush_delay
+        self.entries: Optional[List[dict]] = None
+        self.index = AhoCorasick()
+        # 导入时创建实例, python 3.10 之前 asyncio.Lock 不能在事件循环外创建
+        self._lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def load(self) -> List[dict]:
+        if self.entries is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self.entries is None:
+                    entries = await read_cache(self.key) or []
+                    self.entries = []
+                    for entry in entries:
+                        self._append(entry)
+        return self.entries
+
+    def _append(self, entry: dict) -> None:
+        position = len(self.entries)
+        self.entries.append(entry)
+        for name in (entry.get("cn"), entry.get("jp")):
+            if name:
+                self.index.add(name, position)
+
+    async def lookup(self, text: str) -> Optional[dict]:
+        """
+        查找标题中出现的名称, 多个匹配时返回最早加入缓存的
+        """
+        entries = await self.load()
+        positions = self.index.search(text)
+        if not positions:
+            return None
+        return entries[min(positions)]
+
+    async def add(self, entry: dict) -> None:
+        """
+        添加到缓存, 延迟写入文件
+        """
+        await self.load()
+        self._append(entry)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        写入文件
+        """
+        if self.entries is None:
+            return
+        try:
+            await write_cache(self.key, self.entries)
+        except Exception as e:
+            logger.error(f"番剧名称缓存写入失败: {e}")
+
+    async def close(self) -> None:
+        """
+        取消延迟写入, 立即写入
+        """
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            await self.flush()
+        self._flush_task = None
+
+
+bangumi_name_cache = BangumiNameCache("bangumi_name_cache")
+
+
+# 集数、分辨率, 同一番剧不同集的标题去掉后相同
+EPISODE_PATTERNS = [
+    re.compile(r"\[\d{1,4}(?:\.\d)?(?:v\d)?\]", re.I),
+    re.compile(r"(?<=\s)-\s*\d{1,4}(?:\.\d)?(?:v\d)?(?=\s|\[|$)", re.I),
+    re.compile(r"第\s*\d{1,4}\s*[话話集]"),
+    re.compile(r"\bEP?\s?\d{1,4}(?:v\d)?\b", re.I),
+    re.compile(r"\b\d{3,4}p\b", re.I),
+]
+
+EMPTY_BANGUMI = {"cn": None, "jp": None}
+
+# 正在识别的标题, {标准化标题: 识别结果}, 相同的标题只请求一次
+_in_flight: Dict[str, asyncio.Future] = {}
+
+_gpt_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def find_bangumi_name_local(text: str) -> Optional[dict]:
+    """
+    本地解析番剧名称, 置信度低于阈值时返回 None
+    """
+    release = parse_release_name(text)
+    if release.confidence < config.release_name_min_confidence:
+        return None
+    if not (release.cn or release.jp):
+        return None
+    return {"cn": release.cn, "jp": release.jp}
+
+
+def normalize_title(text: str) -> str:
+    """
+    标准化标题, 去掉集数、分辨率和空白, 用于合并同一番剧的请求
+    """
+    for pattern in EPISODE_PATTERNS:
+        text = pattern.sub("", text)
+    return re.sub(r"\s+", "", text).casefold()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算 token 数, 中日文按一个字一个 token
+    """
+    return len(text) + 2
+
+
+def split_batches(texts: List[str]) -> List[List[str]]:
+    """
+    按数量和 token 预算分批
+    """
+    batches: List[List[str]] = []
+    batch: List[str] = []
+    tokens = 0
+    for text in texts:
+        cost = estimate_tokens(text)
+        if batch and (
+            len(batch) >= config.gpt_batch_size
+            or tokens + cost > config.gpt_batch_max_tokens
+        ):
+            batches.append(batch)
+            batch, tokens = [], 0
+        batch.append(text)
+        tokens += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+async def recognize_batch(texts: List[str]) -> List[dict]:
+    """
+    识别一批标题, 批量请求失败时逐个请求
+    """
+    global _gpt_semaphore
+    if _gpt_semaphore is None:
+        _gpt_semaphore = asyncio.Semaphore(max(config.gpt_concurrency, 1))
+    async with _gpt_semaphore:
+        try:
+            return await find_bangumi_names(texts)
+        except Exception as e:
+            logger.warning(f"批量识别番剧名称失败, 逐个识别: {e}")
+    results = []
+    for text in texts:
+        async with _gpt_semaphore:
+            try:
+                results.append(await find_bangumi_name(text))
+            except Exception as e:
+                logger.error(f"find_bangumi_name error: {e}")
+                results.append(EMPTY_BANGUMI)
+    return results
+
+
+def as_bangumi(item: Any) -> dict:
+    """
+    chatgpt 返回的单个结果, 不是 dict 时视为未识别
+    """
+    if not isinstance(item, dict):
+        return EMPTY_BANGUMI
+    return {"cn": item.get("cn"), "jp": item.get("jp")}
+
+
+async def recognize_titles(texts: Dict[str, str]) -> None:
+    """
+    识别 {标准化标题: 标题}, 结果写入 _in_flight 的 future 并加入缓存
+    """
+    keys = list(texts)
+    batches = split_batches([texts[key] for key in keys])
+    results = await asyncio.gather(
+        *(recognize_batch(batch) for batch in batches), return_exceptions=True
+    )
+    index = 0
+    for batch, batch_result in zip(batches, results):
+        for offset in range(len(batch)):
+            key = keys[index + offset]
+            bangumi = EMPTY_BANGUMI
+            if isinstance(batch_result, list):
+                bangumi = as_bangumi(batch_result[offset])
+            if bangumi["cn"] or bangumi["jp"]:
+                await bangumi_name_cache.add(bangumi)
+            future = _in_flight.pop(key)
+            if not future.done():
+                future.set_result(bangumi)
+        index += len(batch)
+
+
+async def find_bangumi_names_cache(texts: List[str]) -> List[dict]:
+    """
+    批量识别番剧名称, 使用缓存
+    未命中缓存时先本地解析标题, 置信度低的标题再交给 chatgpt, 没有配置 chatgpt 时不识别
+    按标准化后的标题合并, 分批请求 chatgpt, 正在识别的相同标题直接等待结果
+    """
+    results: List[Optional[dict]] = []
+    waiting: Dict[int, asyncio.Future] = {}
+    to_recognize: Dict[str, str] = {}
+    loop = asyncio.get_running_loop()
+    for i, text in enumerate(texts):
+        if not text:
+            results.append(EMPTY_BANGUMI)
+            continue
+        cache = await bangumi_name_cache.lookup(text) or find_bangumi_name_local(text)
+        if cache or not config.gpt_api_key:
+            # 没有配置 chatgpt 时只使用缓存和本地解析
+            results.append(cache or EMPTY_BANGUMI)
             continue
-        if (cn and cn in text) or (jp and jp in text):
-            return cache
-
-    # 如果相似度小于设定值，请求 chatgpt
-    try:
-        gpt_result = await find_bangumi_name(text)
-        if not gpt_result["cn"] and not gpt_result["jp"]:
-            return {"cn": None, "jp": None}
-        # 存储到缓存
-        bangumi_name_cache = await read_cache(CACHE_KEY) or []
-        bangumi_name_cache.append(gpt_result)
-        await write_cache(CACHE_KEY, bangumi_name_cache)
-        return gpt_result
-    except Exception as e:
-        logger.error(f"find_bangumi_name_cache error: {e}")
-        return {"cn": None, "jp": None}
+        results.append(None)
+        key = normalize_title(text)
+        future = _in_flight.get(key)
+        if future is None:
+            future = _in_flight[key] = loop.create_future()
+            to_recognize[key] = text
+        waiting[i] = future
+
+    if to_recognize:
+        try:
+            await recognize_titles(to_recognize)
+        except Exception as e:
+            logger.error(f"识别番剧名称失败: {e}")
+        finally:
+            # 异常时释放未完成的标题, 避免其他等待者一直等待
+            for key in to_recognize:
+                future = _in_flight.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_result(EMPTY_BANGUMI)
+
+    for i, future in waiting.items():
+        bangumi = await future
+        if not (bangumi.get("cn") or bangumi.get("jp")):
+            # 同一批中其他标题识别出的名称可能匹配
+            bangumi = await bangumi_name_cache.lookup(texts[i]) or EMPTY_BANGUMI
+        results[i] = bangumi
+    return results
+
+
+async def find_bangumi_name_cache(text: str) -> dict:
+    """
+    识别番剧名称, 使用缓存
+    标题中包含缓存的中文或日文名称时直接使用缓存, 否则本地解析, 置信度低时使用 chatgpt
+    """
+    return (await find_bangumi_names_cache([text]))[0]
@@ -0,0 +1,139 @@
+"""
+关键词匹配
+订阅的白名单/黑名单关键词预先编译为一个正则, 一次扫描完成匹配
+固定字符串的多模式匹配使用 Aho-Corasick 自动机
+"""
+
+import re
+from collections import deque
+from typing import Any, Dict, List, Optional, Pattern, Set, Tuple
+
+from loguru import logger
+
+# 含有反向引用的关键词合并后组号会变化, 不能合并
+BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+# 全局内联标记, 如 (?i), python 3.11 之前合并后会作用于所有关键词, 不能合并
+INLINE_FLAGS = re.compile(r"(?<!\\)\(\?[aiLmsux]+\)")
+
+
+class KeywordMatcher:
+    """
+    关键词匹配器, 支持正则表达式
+    """
+
+    def __init__(self, keywords: List[str]):
+        self.keywords: Tuple[str, ...] = tuple(keywords)
+        self.pattern: Optional[Pattern] = None
+        self.patterns: List[Pattern] = []
+        if not self.keywords:
+            return
+        if not any(
+            BACKREFERENCE.search(keyword) or INLINE_FLAGS.search(keyword)
+            for keyword in self.keywords
+        ):
+            try:
+                self.pattern = re.compile(
+                    "|".join(f"(?:{keyword})" for keyword in self.keywords)
+                )
+                return
+            except re.error:
+                pass
+        # 无法合并时逐个编译, 跳过错误的正则
+        for keyword in self.keywords:
+            try:
+                self.patterns.append(re.compile(keyword))
+            except re.error as e:
+                logger.error(f"关键词正则错误: {keyword}, {e}")
+
+    def __bool__(self) -> bool:
+        return bool(self.keywords)
+
+    def search(self, *texts: Optional[str]) -> bool:
+        """
+        任意一个文本匹配任意一个关键词
+        """
+        for text in texts:
+            if not text:
+                continue
+            if self.pattern is not None:
+                if self.pattern.search(text):
+                    return True
+            elif any(pattern.search(text) for pattern in self.patterns):
+                return True
+        return False
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick 多模式字符串匹配, 一次扫描找出文本中出现的所有模式
+    每个模式关联一个值, 支持增量添加, 添加后第一次查找时重建失败指针
+    """
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.outputs: List[List[Any]] = [[]]
+        """
+        节点对应的值, 重建后包含失败链上所有节点的值
+        """
+        self.values: List[List[Any]] = [[]]
+        """
+        以该节点结尾的模式的值
+        """
+        self._dirty = False
+
+    def add(self, pattern: str, value: Any) -> None:
+        """
+        添加模式, 空字符串忽略
+        """
+        if not pattern:
+            return
+        node = 0
+        for char in pattern:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+                self.values.append([])
+            node = next_node
+        self.values[node].append(value)
+        self._dirty = True
+
+    def _build(self) -> None:
+        queue = deque()
+        for node in self.goto[0].values():
+            self.fail[node] = 0
+            self.outputs[node] = list(self.values[node])
+            queue.append(node)
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self.goto[node].items():
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_node] = self.goto[fail].get(char, 0)
+                self.outputs[next_node] = (
+                    self.values[next_node] + self.outputs[self.fail[next_node]]
+                )
+                queue.append(next_node)
+        self._dirty = False
+
+    def search(self, text: str) -> Set[Any]:
+        """
+        返回文本中出现的所有模式的值
+        """
+        if self._dirty:
+            self._build()
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        result: Set[Any] = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if outputs[node]:
+                result.update(outputs[node])
+        return result
@@ -0,0 +1,208 @@
+"""
+图片缓存
+下载的图片按内容的 sha256 保存在 data/cache/pics, 不同 url 的相同图片只保存一份
+url -> sha256 的索引常驻内存, 延迟写入 data/cache/pic_cache.json
+总大小超过 pic_cache_max_size 时淘汰最久未使用的图片
+"""
+
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from loguru import logger
+
+from config import config
+from src.utils.atomic import atomic_write
+from src.utils.cache import read_cache, write_cache
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def scan_files(path: str) -> "OrderedDict[str, int]":
+    """
+    读取已缓存的图片, 按最近使用时间排序, {sha256: 大小}
+    """
+    os.makedirs(path, exist_ok=True)
+    files = []
+    for entry in os.scandir(path):
+        # 跳过原子写入的临时文件
+        if entry.is_file() and not entry.name.startswith("."):
+            stat = entry.stat()
+            files.append((stat.st_mtime, entry.name, stat.st_size))
+    files.sort()
+    return OrderedDict((name, size) for _, name, size in files)
+
+
+def read_file(path: str) -> bytes:
+    """
+    读取图片并更新修改时间, 重启后按修改时间恢复使用顺序
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    os.utime(path)
+    return data
+
+
+def remove_files(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class PicCache:
+    """
+    图片磁盘缓存, LRU 淘汰
+    文件读写、删除在线程池中执行, 不阻塞事件循环
+    """
+
+    def __init__(self, key: str, path: str, flush_delay: float = 5):
+        self.key = key
+        self.path = path
+        self.flush_delay = flush_delay
+        self.urls: Optional[Dict[str, str]] = None
+        self.digests: Dict[str, Set[str]] = {}
+        """
+        url 索引的反向索引, {sha256: {url}}, 淘汰时删除指向该图片的 url
+        """
+        self.files: "OrderedDict[str, int]" = OrderedDict()
+        self.size = 0
+        # 导入时创建实例, python 3.10 之前 asyncio.Lock 不能在事件循环外创建
+        self._lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def max_size(self) -> int:
+        return config.pic_cache_max_size * 1024 * 1024
+
+    async def load(self) -> Dict[str, str]:
+        if self.urls is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self.urls is None:
+                    loop = asyncio.get_running_loop()
+                    self.files = await loop.run_in_executor(
+                        None, scan_files, self.path
+                    )
+                    self.size = sum(self.files.values())
+                    urls = await read_cache(self.key) or {}
+                    self.digests = {}
+                    for url, digest in urls.items():
+                        if digest in self.files:
+                            self.digests.setdefault(digest, set()).add(url)
+                    self.urls = {
+                        url: digest
+                        for url, digest in urls.items()
+                        if digest in self.files
+                    }
+        return self.urls
+
+    def file_path(self, digest: str) -> str:
+        return os.path.join(self.path, digest)
+
+    async def get(self, url: str) -> Optional[bytes]:
+        """
+        读取缓存的图片, 未缓存时返回 None
+        """
+        if self.max_size <= 0:
+            return None
+        urls = await self.load()
+        digest = urls.get(url)
+        if digest is None:
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            data = await loop.run_in_executor(
+                None, read_file, self.file_path(digest)
+            )
+        except OSError:
+            await self._remove([digest])
+            return None
+        if digest in self.files:
+            self.files.move_to_end(digest)
+        return data
+
+    async def put(self, url: str, data: bytes) -> None:
+        """
+        缓存图片, 内容相同的图片只保存一份
+        """
+        if self.max_size <= 0 or not data:
+            return
+        urls = await self.load()
+        digest = sha256(data)
+        if digest in self.files:
+            self.files.move_to_end(digest)
+        else:
+            try:
+                await atomic_write(self.file_path(digest), data)
+            except Exception as e:
+                logger.error(f"图片缓存写入失败: {url}, {e}")
+                return
+            self.files[digest] = len(data)
+            self.size += len(data)
+        old = urls.get(url)
+        if old is not None and old != digest:
+            self.digests.get(old, set()).discard(url)
+        urls[url] = digest
+        self.digests.setdefault(digest, set()).add(url)
+        await self._evict()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _remove(self, digests: List[str]) -> None:
+        """
+        删除图片和指向它的 url
+        """
+        for digest in digests:
+            self.size -= self.files.pop(digest, 0)
+            for url in self.digests.pop(digest, ()):
+                self.urls.pop(url, None)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, remove_files, [self.file_path(digest) for digest in digests]
+        )
+
+    async def _evict(self) -> None:
+        # 至少保留刚写入的图片
+        evicted = []
+        size = self.size
+        for digest, file_size in self.files.items():
+            if size <= self.max_size or len(self.files) - len(evicted) <= 1:
+                break
+            evicted.append(digest)
+            size -= file_size
+        if evicted:
+            await self._remove(evicted)
+
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        写入索引
+        """
+        if self.urls is None:
+            return
+        try:
+            await write_cache(self.key, self.urls)
+        except Exception as e:
+            logger.error(f"图片缓存索引写入失败: {e}")
+
+    async def close(self) -> None:
+        """
+        取消延迟写入, 立即写入
+        """
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            await self.flush()
+        self._flush_task = None
+
+
+pic_cache = PicCache("pic_cache", os.path.join(config.data_path, "cache", "pics"))
@@ -1,7 +1,7 @@
-import httpx
 from typing import Optional
 
-from src.utils.request import proxy2httpx
+from src.utils.pic_cache import pic_cache
+from src.utils.request import get
 
 
 async def pic_download(
@@ -14,16 +14,26 @@ async def pic_download(
     if headers is None:
         headers = {}
     headers["Referer"] = url
-    async with httpx.AsyncClient(proxies=proxy2httpx(proxy)) as client:
-        try:
-            resp = await client.get(
-                url, params=params, headers=headers, cookies=cookies, timeout=timeout
-            )
-            return resp.content
-        except httpx.ConnectError as e:
-            if str(e) == "":
-                e = "超时"
-            raise Exception(f"{url} 连接失败: {e}")
+    resp = await get(
+        url,
+        params=params,
+        headers=headers,
+        cookies=cookies,
+        timeout=timeout,
+        proxy=proxy,
+    )
+    return resp.content
 
-        except Exception as e:
-            raise Exception(f"{url} 请求失败: {e}")
+
+async def pic_download_cache(url, timeout=10, proxy=None) -> Optional[bytes]:
+    """
+    下载图片, 使用磁盘缓存, 只缓存成功的响应
+    proxy: 代理, 格式为: 127.0.0.1:7890
+    """
+    data = await pic_cache.get(url)
+    if data is not None:
+        return data
+    resp = await get(url, headers={"Referer": url}, timeout=timeout, proxy=proxy)
+    if resp.is_success():
+        await pic_cache.put(url, resp.content)
+    return resp.content
@@ -0,0 +1,254 @@
+"""
+番剧发布标题解析
+按字幕组常见的命名规则在本地解析标题, 例如:
+[Lilith-Raws] AI 电子基因 / AI no Idenshi - 03 [Baha][WebDL 1080p AVC AAC][CHT]
+【喵萌奶茶屋】★04月新番★[夏日重现 / Summer Time Rendering][11][1080p][简日双语]
+结果带有置信度, 置信度低时再交给 chatgpt 识别
+"""
+
+import re
+from typing import List, Match, Optional, Pattern, Tuple
+
+from pydantic import BaseModel
+
+# 方括号 / 黑色方头括号包围的片段
+BRACKET = re.compile(r"[\[【]([^\[\]【】]*)[\]】]")
+
+# 装饰文字, 如 ★04月新番★
+DECORATION = re.compile(r"★[^★]*★|☆[^☆]*☆")
+
+# 括号中的技术参数, 如 (Baha 1920x1080 AVC AAC MP4), 转换为方括号按标签处理
+PARENTHESES = re.compile(r"[(（]([^()（）]*)[)）]")
+
+# 文件扩展名
+EXTENSION = re.compile(r"\.(?:mkv|mp4|avi)$", re.I)
+
+# 单独成段的集数, 如 [03] [03v2] [12.5] [03END] [第03话] [03集]
+EPISODE_BRACKET = re.compile(
+    r"^(?:第\s*)?(\d{1,4}(?:\.\d)?)(?:\s*[vV](\d))?"
+    r"\s*(?:[话話集])?\s*(?:END|完)?$",
+    re.I,
+)
+
+# 标题中的集数, 如 " - 03" "第03话" "EP03", 只匹配片段末尾
+EPISODE_PLAIN = re.compile(
+    r"(?:(?:^|\s)-\s*|第\s*|\bEP?\s?)(\d{1,4}(?:\.\d)?)(?:\s*[vV](\d))?"
+    r"\s*(?:[话話集])?\s*(?:END|完)?\s*$",
+    re.I,
+)
+
+RESOLUTION = re.compile(
+    r"(?<![a-z0-9])(?:\d{3,4}x(\d{3,4})|(\d{3,4})p|(4K))(?![a-z0-9])", re.I
+)
+
+# 技术参数、语言等标签, 匹配到的方括号片段不作为标题
+TAG = re.compile(
+    r"\d{3,4}[pP]|\d{3,4}x\d{3,4}|\b4K\b|WEB-?DL|WEB-?Rip|BD-?Rip|Baha|HEVC|AVC"
+    r"|x26[45]|AAC|FLAC|MP4|MKV|\d{1,2}-?bit|GB|BIG5|CH[ST]|JP[ST]C"
+    r"|字幕|内[封嵌]|外挂|双语|新番|招募|[合全]集|^[简繁日英中]{1,3}[体中文语]*$",
+    re.I,
+)
+
+LANGUAGES: List[Tuple[str, Pattern]] = [
+    ("CHS", re.compile(r"CHS|SC(?![A-Z])|GB(?![A-Z])|简")),
+    ("CHT", re.compile(r"CHT|TC(?![A-Z])|BIG5|繁")),
+    ("JP", re.compile(r"JP|日")),
+    ("ENG", re.compile(r"ENG|英")),
+]
+
+TITLE_SEPARATOR = re.compile(r"\s*[/／|_]\s*")
+# 中文名称后直接跟英文名称, 如: 少女乐队的呐喊 Girls Band Cry
+MIXED_TITLE = re.compile(r"^(.*[一-鿿！？，：）》」』])\s+([A-Za-z][\w'!?:.,&\- ]*)$")
+# 版本号等字母和数字混合的词, 如 Ver1.1a, 出现在名称中时多半拆分有误
+VERSION_TOKEN = re.compile(r"(?<![A-Za-z])(?:Ver|v)\.?\s?\d+(?:\.\d+)*[a-z]?\b", re.I)
+HAN = re.compile(r"[一-鿿]")
+KANA = re.compile(r"[぀-ヿ]")
+LATIN_WORD = re.compile(r"[A-Za-z]{2,}")
+
+
+class ReleaseName(BaseModel):
+    """
+    解析结果
+    """
+
+    group: Optional[str] = None
+    """
+    字幕组
+    """
+    cn: Optional[str] = None
+    """
+    中文名称
+    """
+    jp: Optional[str] = None
+    """
+    日文名称, 没有日文时为罗马音或英文名称
+    """
+    episode: Optional[str] = None
+    """
+    集数, 去掉前导 0, 如 3 / 12.5
+    """
+    version: Optional[int] = None
+    """
+    版本, 如 03v2 为 2
+    """
+    resolution: Optional[str] = None
+    """
+    分辨率, 如 1080p
+    """
+    languages: List[str] = []
+    """
+    字幕语言, CHS / CHT / JP / ENG
+    """
+    confidence: float = 0
+    """
+    置信度, 0 ~ 1
+    """
+
+
+def split_segments(title: str) -> List[Tuple[str, bool]]:
+    """
+    拆分为 (文本, 是否在括号中) 片段
+    """
+    segments = []
+    position = 0
+    for match in BRACKET.finditer(title):
+        text = title[position : match.start()].strip()
+        if text:
+            segments.append((text, False))
+        segments.append((match.group(1).strip(), True))
+        position = match.end()
+    text = title[position:].strip()
+    if text:
+        segments.append((text, False))
+    return segments
+
+
+def format_episode(episode: str) -> str:
+    """
+    去掉集数的前导 0
+    """
+    return str(float(episode)) if "." in episode else str(int(episode))
+
+
+def set_episode(result: ReleaseName, match: Match) -> None:
+    """
+    记录第一次出现的集数和版本
+    """
+    if result.episode is None:
+        result.episode = format_episode(match.group(1))
+        result.version = int(match.group(2)) if match.group(2) else None
+
+
+def split_title(title: str) -> Tuple[Optional[str], Optional[str], bool]:
+    """
+    按分隔符拆分中文和日文名称
+    返回 (cn, jp, 是否有歧义)
+    """
+    cn = jp = None
+    ambiguous = False
+    for part in TITLE_SEPARATOR.split(title):
+        part = part.strip(" _")
+        if not part:
+            continue
+        if KANA.search(part):
+            jp = jp or part
+        elif HAN.search(part):
+            if cn is not None:
+                jp = jp or part
+                continue
+            mixed = MIXED_TITLE.match(part)
+            if mixed and not KANA.search(mixed.group(2)):
+                # 中文和英文名称之间没有分隔符, 按文字切换的位置拆分
+                cn, jp = mixed.group(1).strip(), jp or mixed.group(2).strip()
+                ambiguous = True
+            else:
+                cn = part
+                ambiguous = len(LATIN_WORD.findall(part)) >= 2
+        else:
+            jp = jp or part
+    return cn, jp, ambiguous
+
+
+def tag_parentheses(match: Match) -> str:
+    return f"[{match.group(1)}]" if TAG.search(match.group(1)) else match.group(0)
+
+
+def strip_tags(text: str) -> str:
+    """
+    去掉文本末尾的标签, 如: 第06话 MP4 720p
+    """
+    words = text.split()
+    while words and TAG.search(words[-1]):
+        words.pop()
+    return " ".join(words)
+
+
+def parse_release_name(title: str) -> ReleaseName:
+    """
+    解析番剧发布标题
+    """
+    result = ReleaseName()
+    title = DECORATION.sub("", title.strip())
+    title = EXTENSION.sub("", PARENTHESES.sub(tag_parentheses, title))
+    segments = split_segments(title)
+    # 第一个括号是字幕组, 字幕组名称中可能有 "字幕" 等标签文字, 只排除集数和分辨率
+    if (
+        segments
+        and segments[0][1]
+        and not EPISODE_BRACKET.match(segments[0][0])
+        and not RESOLUTION.search(segments[0][0])
+    ):
+        result.group = segments.pop(0)[0] or None
+
+    # 集数之前的非标签片段都是名称, 如: [中文名][Romaji][06]
+    names = []
+    languages = set()
+    for text, bracketed in segments:
+        if bracketed:
+            episode = EPISODE_BRACKET.match(text)
+            if episode:
+                set_episode(result, episode)
+            elif TAG.search(text):
+                for language, pattern in LANGUAGES:
+                    if pattern.search(text):
+                        languages.add(language)
+            elif result.episode is None:
+                names.append(text)
+            continue
+        text = strip_tags(text)
+        episode = EPISODE_PLAIN.search(text)
+        if episode:
+            text = text[: episode.start()].strip()
+        if result.episode is None and text:
+            names.append(text)
+        if episode:
+            set_episode(result, episode)
+    name = " / ".join(names)
+
+    resolution = RESOLUTION.search(title)
+    if resolution:
+        height = resolution.group(1) or resolution.group(2) or "2160"
+        result.resolution = f"{height}p"
+    result.languages = [lang for lang, _ in LANGUAGES if lang in languages]
+
+    ambiguous = False
+    if name:
+        result.cn, result.jp, ambiguous = split_title(name)
+
+    confidence = 0.0
+    if result.cn or result.jp:
+        confidence += 0.5
+    if result.episode is not None:
+        confidence += 0.3
+    if result.group:
+        confidence += 0.1
+    if result.resolution or result.languages:
+        confidence += 0.1
+    if ambiguous:
+        confidence -= 0.2
+    if any(VERSION_TOKEN.search(n) for n in (result.cn, result.jp) if n):
+        confidence -= 0.3
+    if name and (len(name) > 80 or name.isdigit()):
+        confidence -= 0.3
+    result.confidence = round(max(confidence, 0.0), 2)
+    return result
@@ -1,6 +1,21 @@
+import asyncio
+import importlib.util
+import time
 import httpx
 from src.models import Response
-from typing import Optional
+from typing import Any, Dict, Hashable, Optional, Tuple
+from config import config
+from loguru import logger
+
+
+# 共享的 http 客户端, 每个代理一个, 复用连接
+CLIENTS: Dict[Optional[str], httpx.AsyncClient] = {}
+
+# 正在进行的 GET 请求, 相同的请求只发送一次, 其他调用等待同一个结果
+IN_FLIGHT: Dict[Hashable, asyncio.Task] = {}
+
+# 短时间的响应缓存, {请求: (过期时间, 响应)}
+RESPONSE_CACHE: Dict[Hashable, Tuple[float, Response]] = {}
 
 
 def proxy2httpx(proxy: Optional[str]) -> dict:
@@ -15,49 +30,218 @@ def proxy2httpx(proxy: Optional[str]) -> dict:
     }
 
 
+def get_client(proxy: Optional[str] = None) -> httpx.AsyncClient:
+    """
+    获取共享的 http 客户端, 同一代理复用同一个连接池
+    proxy: 代理, 格式为: 127.0.0.1:7890
+    """
+    proxy = proxy or None
+    client = CLIENTS.get(proxy)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            proxies=proxy2httpx(proxy),
+            http2=config.http2 and importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=config.http_max_connections,
+                max_keepalive_connections=config.http_max_keepalive_connections,
+                keepalive_expiry=config.http_keepalive_expiry,
+            ),
+        )
+        CLIENTS[proxy] = client
+    return client
+
+
+async def close_clients() -> None:
+    """
+    关闭所有共享的 http 客户端
+    """
+    for proxy, client in list(CLIENTS.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.error(f"关闭 http 客户端失败: {proxy}, {e}")
+    CLIENTS.clear()
+
+
+async def fetch(
+    url, params=None, headers=None, cookies=None, timeout=10, proxy=None
+) -> Response:
+    """
+    发送 GET 请求, 不合并、不缓存
+    proxy: 代理, 格式为: 127.0.0.1:7890
+    """
+    client = get_client(proxy)
+    try:
+        resp = await client.get(
+            url, params=params, headers=headers, cookies=cookies, timeout=timeout
+        )
+        return Response(
+            status_code=resp.status_code,
+            content=resp.content,
+            headers=resp.headers,
+            encoding=resp.charset_encoding,
+        )
+    except httpx.ConnectError as e:
+        if str(e) == "":
+            e = "超时"
+        raise Exception(f"{url} 连接失败: {e}")
+
+    except Exception as e:
+        raise Exception(f"{url} 请求失败: {e}")
+
+
+def freeze(value: Any, lower: bool = False) -> Hashable:
+    """
+    转换为可哈希的值, 用于请求的 key
+    lower: 键不区分大小写, 用于请求头
+    """
+    if value is None:
+        return None
+    if hasattr(value, "items"):
+        items = [(str(k), str(v)) for k, v in value.items()]
+        if lower:
+            items = [(k.lower(), v) for k, v in items]
+        return tuple(sorted(items))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return str(value)
+
+
+def request_key(url, params, headers, cookies, proxy) -> Hashable:
+    return (
+        str(url),
+        freeze(params),
+        freeze(headers, lower=True),
+        freeze(cookies),
+        proxy or None,
+    )
+
+
+def remove_expired(now: float) -> None:
+    """
+    清理过期的缓存
+    """
+    expired = [k for k, (expires, _) in RESPONSE_CACHE.items() if expires < now]
+    for k in expired:
+        RESPONSE_CACHE.pop(k, None)
+
+
+def get_cached_response(key: Hashable) -> Optional[Response]:
+    """
+    读取未过期的缓存, 同时清理过期的缓存
+    """
+    if not RESPONSE_CACHE:
+        return None
+    remove_expired(time.monotonic())
+    cached = RESPONSE_CACHE.get(key)
+    return cached[1] if cached is not None else None
+
+
+def cache_response(key: Hashable, response: Response) -> None:
+    """
+    缓存成功的响应, 同时清理过期的缓存
+    """
+    if config.http_cache_ttl <= 0 or not response.is_success():
+        return
+    now = time.monotonic()
+    remove_expired(now)
+    RESPONSE_CACHE[key] = (now + config.http_cache_ttl, response)
+
+
+def _on_fetch_done(key: Hashable, task: asyncio.Task) -> None:
+    if IN_FLIGHT.get(key) is task:
+        IN_FLIGHT.pop(key)
+    # 所有调用者都取消时, 避免 "exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
 async def get(
+    url,
+    params=None,
+    headers=None,
+    cookies=None,
+    timeout=10,
+    proxy=None,
+    cache: bool = False,
+) -> Response:
+    """
+    GET 请求
+    proxy: 代理, 格式为: 127.0.0.1:7890
+    cache: 合并和缓存请求, 只用于订阅抓取, 图片、种子等大文件不缓存
+    相同的 url / 参数 / 请求头 / 代理同时请求时只发送一次, 共用一个响应
+    http_cache_ttl 大于 0 时, 成功的响应缓存一段时间, 期间相同的请求直接使用缓存
+    """
+    if not cache:
+        return await fetch(url, params, headers, cookies, timeout, proxy)
+    key = request_key(url, params, headers, cookies, proxy)
+    response = get_cached_response(key)
+    if response is None:
+        task = IN_FLIGHT.get(key)
+        if task is None:
+
+            async def run() -> Response:
+                result = await fetch(url, params, headers, cookies, timeout, proxy)
+                cache_response(key, result)
+                return result
+
+            task = IN_FLIGHT[key] = asyncio.ensure_future(run())
+            task.add_done_callback(lambda t: _on_fetch_done(key, t))
+        # 一个调用者取消时不影响其他等待的调用者
+        response = await asyncio.shield(task)
+    # 每个调用者一个副本, 共用响应内容
+    return response.model_copy()
+
+
+async def get_stream(
     url, params=None, headers=None, cookies=None, timeout=10, proxy=None
 ) -> Response:
     """
+    流式请求, 只读取响应头, 响应体通过 Response.stream 逐块读取
+    使用完成后需要调用 Response.aclose
     proxy: 代理, 格式为: 127.0.0.1:7890
     """
-    async with httpx.AsyncClient(proxies=proxy2httpx(proxy)) as client:
-        try:
-            resp = await client.get(
-                url, params=params, headers=headers, cookies=cookies, timeout=timeout
-            )
-            return Response(
-                status_code=resp.status_code,
-                content=resp.text,
-                headers=resp.headers,
-            )
-        except httpx.ConnectError as e:
-            if str(e) == "":
-                e = "超时"
-            raise Exception(f"{url} 连接失败: {e}")
+    client = get_client(proxy)
+    try:
+        request = client.build_request(
+            "GET", url, params=params, headers=headers, cookies=cookies, timeout=timeout
+        )
+        resp = await client.send(request, stream=True)
+        return Response(
+            status_code=resp.status_code,
+            content=None,
+            headers=resp.headers,
+            encoding=resp.charset_encoding,
+            stream=resp,
+        )
+    except httpx.ConnectError as e:
+        if str(e) == "":
+            e = "超时"
+        raise Exception(f"{url} 连接失败: {e}")
 
-        except Exception as e:
-            raise Exception(f"{url} 请求失败: {e}")
+    except Exception as e:
+        raise Exception(f"{url} 请求失败: {e}")
 
 
 async def post(
     url, data=None, json=None, headers=None, cookies=None, timeout=10, proxy=None
 ) -> Response:
 
-    async with httpx.AsyncClient(proxies=proxy2httpx(proxy)) as client:
-        try:
-            resp = await client.post(
-                url,
-                data=data,
-                json=json,
-                headers=headers,
-                cookies=cookies,
-                timeout=timeout,
-            )
-            return Response(
-                status_code=resp.status_code,
-                content=resp.text,
-                headers=resp.headers,
-            )
-        except Exception as e:
-            raise Exception(f"{url} 请求失败: {e}")
+    client = get_client(proxy)
+    try:
+        resp = await client.post(
+            url,
+            data=data,
+            json=json,
+            headers=headers,
+            cookies=cookies,
+            timeout=timeout,
+        )
+        return Response(
+            status_code=resp.status_code,
+            content=resp.content,
+            headers=resp.headers,
+            encoding=resp.charset_encoding,
+        )
+    except Exception as e:
+        raise Exception(f"{url} 请求失败: {e}")
@@ -0,0 +1,45 @@
+"""
+json 序列化
+安装了 orjson 时使用 orjson, 否则使用标准库 json
+机器读取的文件 (数据、缓存、发件箱) 紧凑输出, 需要人工查看的配置文件使用 pretty 缩进输出
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def default(obj: Any) -> Any:
+    """
+    无法直接序列化的类型, set 和 tuple 的子类 (如 time.struct_time) 转换为 list
+    """
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+def dumps(obj: Any, pretty: bool = False) -> str:
+    """
+    序列化为字符串, 不转义非 ASCII 字符
+    pretty: 缩进输出, 只用于需要人工查看的文件
+    """
+    if pretty:
+        return json.dumps(obj, indent=4, ensure_ascii=False, default=default)
+    if orjson is not None:
+        return orjson.dumps(
+            obj, default=default, option=orjson.OPT_NON_STR_KEYS
+        ).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=default)
+
+
+def loads(data: Any) -> Any:
+    """
+    反序列化, 支持 str 和 bytes
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
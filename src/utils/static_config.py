@@ -0,0 +1,36 @@
+"""
+静态配置缓存
+Spider / Action 的静态配置每个类只读取一次 .env, 所有实例共用
+"""
+
+from typing import Dict, Type, TypeVar
+
+from loguru import logger
+from pydantic_settings import BaseSettings
+
+T = TypeVar("T", bound=BaseSettings)
+
+STATIC_CONFIGS: Dict[Type[BaseSettings], BaseSettings] = {}
+
+
+def get_static_config(config_class: Type[T]) -> T:
+    """
+    获取静态配置, 同一个类只创建一次
+    """
+    static_config = STATIC_CONFIGS.get(config_class)
+    if static_config is None:
+        static_config = STATIC_CONFIGS[config_class] = config_class()
+    return static_config
+
+
+def reload_static_configs() -> int:
+    """
+    重新读取 .env, 原地更新已创建的静态配置, 正在运行的订阅立即生效
+    返回更新的数量
+    """
+    for config_class, static_config in STATIC_CONFIGS.items():
+        try:
+            static_config.__init__()
+        except Exception as e:
+            logger.error(f"重新读取静态配置失败: {config_class.__name__}, {e}")
+    return len(STATIC_CONFIGS)
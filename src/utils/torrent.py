@@ -1,21 +1,18 @@
 import base64
 from typing import Optional
 
-import httpx
-
-from utils.request import proxy2httpx
+from src.utils.request import get
 
 
 async def download_torrent(url: str, proxy: Optional[str] = None) -> Optional[bytes]:
     """
     下载torrent文件
     """
-    async with httpx.AsyncClient(proxies=proxy2httpx(proxy)) as client:
-        try:
-            resp = await client.get(url)
-            return resp.content
-        except Exception as e:
-            raise Exception(f"{url} 下载失败: {e}")
+    try:
+        resp = await get(url, proxy=proxy)
+        return resp.content
+    except Exception as e:
+        raise Exception(f"{url} 下载失败: {e}")
 
 
 def get_torrent_b16_hash(content: bytes) -> str:
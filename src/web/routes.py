@@ -1,6 +1,8 @@
 # 路由
 from fastapi import APIRouter
 
+from src.subscription.dispatch import dispatcher
+
 
 router = APIRouter()
 
@@ -8,3 +10,8 @@ router = APIRouter()
 @router.get("/")
 async def root():
     return {"message": "Hello World"}
+
+
+@router.get("/metrics")
+async def metrics():
+    return {"actions": dispatcher.metrics()}
@@ -0,0 +1,57 @@
+from typing import Optional
+
+from pydantic import PrivateAttr
+
+from src.database.adata import (
+    ADATA_SCHEMA_VERSION,
+    adata2record,
+    construct_adata,
+    record2adata,
+)
+from src.spider.routes.mikanani.mikanani_rss import MikananiRssSpiderAData
+
+
+class PrivateAData(MikananiRssSpiderAData):
+    _cache: Optional[str] = PrivateAttr(default="empty")
+
+
+def mikan_adata() -> MikananiRssSpiderAData:
+    return MikananiRssSpiderAData(
+        id="MikananiRssSpider_1",
+        title="[ANi] 番剧 - 01 [1080P]",
+        content="[ANi] 番剧 - 01 [1080P]",
+        url="https://mikanani.me/Home/Episode/1",
+        source="Mikan Project",
+        push_time=1720192140000,
+        content_length=1024,
+    )
+
+
+def test_trusted_record_round_trip():
+    adata = mikan_adata()
+    record = adata2record(adata)
+    assert record["__version__"] == ADATA_SCHEMA_VERSION
+    loaded = record2adata(record)
+    assert type(loaded) is MikananiRssSpiderAData
+    assert loaded == adata
+
+
+def test_legacy_record_is_validated():
+    record = adata2record(mikan_adata())
+    del record["__version__"]
+    record["content_length"] = "2048"
+    assert record2adata(record).content_length == 2048
+
+
+def test_missing_fields_use_defaults():
+    record = {"id": "1", "title": "t", "content": "c", "__version__": 1}
+    adata = construct_adata(MikananiRssSpiderAData, record)
+    assert adata.content_length == 0
+    assert adata.magnet_url is None
+
+
+def test_private_attributes():
+    adata = construct_adata(PrivateAData, adata2record(mikan_adata()))
+    assert adata._cache == "empty"
+    adata._cache = "set"
+    assert adata._cache == "set"
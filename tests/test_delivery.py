@@ -0,0 +1,95 @@
+import asyncio
+import sys
+
+import pytest
+
+from src.action import create_actions
+from src.database import backend
+from src.database.adata import save_ids
+from src.database.backend import JsonADataStorage
+from src.database.outbox import Outbox
+from src.database.seen import SEEN_INDEXES, get_seen_index
+from src.models import Response, Subscription
+from src.spider import create_spider
+from src.spider.routes.rss.rss import RssSpider
+
+with open("fixtures/rss.xml", "rb") as f:
+    RSS = f.read()
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    box = Outbox(str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(backend, "_storage", JsonADataStorage(str(tmp_path)))
+    monkeypatch.setattr(sys.modules["src.database.outbox"], "outbox", box)
+    SEEN_INDEXES.clear()
+    yield box
+    SEEN_INDEXES.clear()
+
+
+@pytest.fixture
+def subscription(monkeypatch):
+    async def request(self, subscription):
+        return Response(status_code=200, content=RSS, headers={})
+
+    monkeypatch.setattr(RssSpider, "request", request)
+    return Subscription(
+        name="rss",
+        cron="0 */5 * * * *",
+        spider=create_spider(
+            {
+                "name": "RssSpider",
+                "support_actions": ["BaseAction"],
+                "dynamic_config": {"url": "https://example.com"},
+            }
+        ),
+        actions=create_actions([{"name": "BaseAction"}]),
+    )
+
+
+def test_failed_handling_is_not_marked_seen(outbox, subscription, monkeypatch):
+    async def handle_new_adata(self, adatas, subscription):
+        raise Exception("gpt error")
+
+    monkeypatch.setattr(RssSpider, "handle_new_adata", handle_new_adata)
+
+    async def run():
+        # 已有数据, 不是首次抓取
+        await save_ids(["old"], subscription)
+        with pytest.raises(Exception):
+            await subscription.spider.start(subscription)
+        entries = await outbox.claim("rss", 1000, 1000)
+        return len(await get_seen_index("rss")), entries
+
+    seen, entries = asyncio.run(run())
+    # 处理失败的数据没有标记为已读, 下次抓取会重新处理
+    assert seen == 1
+    assert entries == []
+
+
+def test_new_data_is_queued_before_seen(outbox, subscription):
+    async def run():
+        await save_ids(["old"], subscription)
+        adatas = await subscription.spider.start(subscription)
+        entries = await outbox.claim("rss", 1000, 1000)
+        return adatas, len(await get_seen_index("rss")), entries
+
+    adatas, seen, entries = asyncio.run(run())
+    assert seen == len(adatas) + 1
+    assert sorted(entry.adata.id for entry in entries) == sorted(a.id for a in adatas)
+
+
+def test_renew_keeps_claimed_entries(outbox, subscription):
+    async def run():
+        await save_ids(["old"], subscription)
+        await subscription.spider.start(subscription)
+        claimed = await outbox.claim("rss", 1000, 50)
+        await asyncio.sleep(0.03)
+        await outbox.renew([entry.id for entry in claimed], 1000)
+        await asyncio.sleep(0.05)
+        # 租期已续, 其他投递取不到正在排队的记录
+        return claimed, await outbox.claim("rss", 1000, 50)
+
+    claimed, again = asyncio.run(run())
+    assert len(claimed) == 150
+    assert again == []
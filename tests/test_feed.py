@@ -0,0 +1,119 @@
+import asyncio
+import glob
+
+import pytest
+
+from src.utils import feed
+from src.utils.feed import FEED_PARSERS, iter_feed_stream, lxml_etree
+
+FIXTURES = sorted(glob.glob("fixtures/*.xml"))
+ENGINES = ["etree"] + (["lxml"] if lxml_etree is not None else [])
+
+
+def entry_fields(entry: dict) -> dict:
+    """
+    spider 实际使用的字段
+    """
+    return {
+        "id": entry.get("id"),
+        "title": entry.get("title"),
+        "link": entry.get("link"),
+        "summary": entry.get("summary"),
+        "content": [content["value"] for content in entry.get("content", [])],
+        "published": entry.get("published"),
+        "author": entry.get("author"),
+        "tags": [tag.get("term") for tag in entry.get("tags", [])],
+        "contentlength": entry.get("contentlength"),
+        "links": [(link["rel"], link["href"]) for link in entry.get("links", [])],
+    }
+
+
+def expected(path: str):
+    with open(path, "rb") as f:
+        content = f.read()
+    feed, entries = FEED_PARSERS["feedparser"](content)
+    return content, feed, [entry_fields(entry) for entry in entries]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("path", FIXTURES)
+def test_parser_parity(path, engine):
+    content, feed, entries = expected(path)
+    result_feed, result = FEED_PARSERS[engine](content)
+    assert result_feed.get("title") == feed.get("title")
+    assert len(result) == len(entries)
+    for a, b in zip(entries, result):
+        assert entry_fields(b) == a
+
+
+@pytest.mark.parametrize("path", FIXTURES)
+def test_stream_parity(path):
+    content, _, entries = expected(path)
+
+    async def chunks():
+        for i in range(0, len(content), 1024):
+            yield content[i : i + 1024]
+
+    async def run():
+        return [entry async for _, entry in iter_feed_stream(chunks())]
+
+    result = asyncio.run(run())
+    assert [entry_fields(entry) for entry in result] == entries
+
+
+def test_sanitized_summary():
+    with open("fixtures/rsshub.xml", "rb") as f:
+        _, entries = FEED_PARSERS["etree"](f.read())
+    summary = entries[1]["summary"]
+    assert "<script" not in summary
+    assert "<br />" in summary
+
+
+GBK_RSS = (
+    "<rss><channel><title>频道</title>"
+    "<item><title>标题</title><link>https://example.com/1</link></item>"
+    "</channel></rss>"
+).encode("gbk")
+GBK_TYPE = "application/rss+xml; charset=GBK"
+
+
+@pytest.mark.parametrize("engine", ["feedparser"] + ENGINES)
+def test_header_charset(engine):
+    feed, entries = FEED_PARSERS[engine](GBK_RSS, GBK_TYPE)
+    assert feed["title"] == "频道"
+    assert entries[0]["title"] == "标题"
+
+
+def test_stream_header_charset():
+    async def chunks():
+        # 多字节字符跨数据块
+        for i in range(0, len(GBK_RSS), 7):
+            yield GBK_RSS[i : i + 7]
+
+    async def run():
+        return [entry async for _, entry in iter_feed_stream(chunks(), GBK_TYPE)]
+
+    assert [entry["title"] for entry in asyncio.run(run())] == ["标题"]
+
+
+def test_sanitizer_available():
+    # feedparser 升级后内部的清理函数不存在时, etree / lxml 会退回 feedparser
+    assert feed._sanitize_html is not None
+
+
+def test_missing_sanitizer_falls_back(monkeypatch):
+    monkeypatch.setattr(feed, "_sanitize_html", None)
+    with open("fixtures/rsshub.xml", "rb") as f:
+        content = f.read()
+    _, expected = FEED_PARSERS["feedparser"](content)
+    _, entries = feed.parse_feed(content, "etree")
+    assert [e["summary"] for e in entries] == [e["summary"] for e in expected]
+
+    async def chunks():
+        yield content
+
+    async def run():
+        return [entry async for _, entry in feed.iter_feed_stream(chunks())]
+
+    result = asyncio.run(run())
+    assert [e["summary"] for e in result] == [e["summary"] for e in expected]
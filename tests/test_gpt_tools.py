@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from config import config
+from src.utils import gpt_tools
+from src.utils.gpt_tools import BangumiNameCache, find_bangumi_names_cache
+
+STANDARD = "[LoliHouse] 葬送的芙莉莲 / Sousou no Frieren - 03 [WebRip 1080p HEVC-10bit AAC]"
+UNKNOWN = "葬送的芙莉莲 全集 BDRip"
+
+
+@pytest.fixture
+def gpt_calls(monkeypatch):
+    calls = []
+    cache = BangumiNameCache("test")
+    cache.entries = []
+    monkeypatch.setattr(gpt_tools, "bangumi_name_cache", cache)
+
+    async def find_bangumi_names(texts):
+        calls.append(list(texts))
+        return [{"cn": "gpt", "jp": None} for _ in texts]
+
+    monkeypatch.setattr(gpt_tools, "find_bangumi_names", find_bangumi_names)
+    return calls
+
+
+def test_local_parse_without_gpt_key(gpt_calls, monkeypatch):
+    monkeypatch.setattr(config, "gpt_api_key", None)
+    result = asyncio.run(find_bangumi_names_cache([STANDARD, UNKNOWN]))
+    assert result == [
+        {"cn": "葬送的芙莉莲", "jp": "Sousou no Frieren"},
+        {"cn": None, "jp": None},
+    ]
+    assert gpt_calls == []
+
+
+def test_gpt_only_for_low_confidence(gpt_calls, monkeypatch):
+    monkeypatch.setattr(config, "gpt_api_key", "key")
+    result = asyncio.run(find_bangumi_names_cache([STANDARD, UNKNOWN]))
+    assert result[0] == {"cn": "葬送的芙莉莲", "jp": "Sousou no Frieren"}
+    assert result[1] == {"cn": "gpt", "jp": None}
+    assert gpt_calls == [[UNKNOWN]]
+
+
+def test_non_dict_fallback_result(gpt_calls, monkeypatch):
+    monkeypatch.setattr(config, "gpt_api_key", "key")
+
+    async def find_bangumi_names(texts):
+        raise ValueError("bad batch")
+
+    async def find_bangumi_name(text):
+        return ["not", "a", "dict"]
+
+    monkeypatch.setattr(gpt_tools, "find_bangumi_names", find_bangumi_names)
+    monkeypatch.setattr(gpt_tools, "find_bangumi_name", find_bangumi_name)
+    result = asyncio.run(find_bangumi_names_cache([UNKNOWN]))
+    assert result == [{"cn": None, "jp": None}]
@@ -0,0 +1,23 @@
+from src.utils.keyword import KeywordMatcher
+
+
+def test_merged_pattern():
+    matcher = KeywordMatcher(["foo", "ba[rz]"])
+    assert matcher.pattern is not None
+    assert matcher.search("bar")
+    assert not matcher.search("qux")
+
+
+def test_inline_flag_only_affects_its_keyword():
+    matcher = KeywordMatcher(["(?i)foo", "BAR"])
+    assert matcher.pattern is None
+    assert matcher.search("FOO")
+    assert matcher.search("BAR")
+    assert not matcher.search("bar")
+
+
+def test_scoped_flag_is_merged():
+    matcher = KeywordMatcher(["(?i:foo)", "BAR", r"\(\?i\)"])
+    assert matcher.pattern is not None
+    assert matcher.search("FOO")
+    assert not matcher.search("bar")
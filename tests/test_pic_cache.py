@@ -0,0 +1,99 @@
+import asyncio
+import sys
+
+import pytest
+
+from config import config
+from src.models import Response
+from src.utils import pic_download
+from src.utils.pic_cache import PicCache
+
+bot_module = sys.modules["src.bot"]
+pic_cache_module = sys.modules["src.utils.pic_cache"]
+
+KB = 1024
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    async def read_cache(key):
+        return None
+
+    async def write_cache(key, value):
+        pass
+
+    monkeypatch.setattr(pic_cache_module, "read_cache", read_cache)
+    monkeypatch.setattr(pic_cache_module, "write_cache", write_cache)
+    monkeypatch.setattr(config, "pic_cache_max_size", 1)
+    cache = PicCache("test_pic_cache", str(tmp_path / "pics"))
+    monkeypatch.setattr(pic_download, "pic_cache", cache)
+    return cache
+
+
+def test_hit_skips_download(cache, monkeypatch):
+    calls = []
+
+    async def get(url, **kwargs):
+        calls.append(url)
+        return Response(status_code=200, content=b"image", headers={})
+
+    monkeypatch.setattr(pic_download, "get", get)
+
+    async def run():
+        first = await pic_download.pic_download_cache("https://example.com/a.jpg")
+        second = await pic_download.pic_download_cache("https://example.com/a.jpg")
+        return first, second
+
+    assert asyncio.run(run()) == (b"image", b"image")
+    assert calls == ["https://example.com/a.jpg"]
+
+
+def test_same_content_stored_once(cache, tmp_path):
+    async def run():
+        await cache.put("https://example.com/a.jpg", b"image")
+        await cache.put("https://example.com/b.jpg", b"image")
+        return await cache.get("https://example.com/b.jpg")
+
+    assert asyncio.run(run()) == b"image"
+    assert len(list((tmp_path / "pics").iterdir())) == 1
+    assert cache.size == len(b"image")
+
+
+def test_evicts_least_recently_used(cache, tmp_path):
+    a, b, c = (bytes([i]) * 400 * KB for i in range(3))
+
+    async def run():
+        await cache.put("a", a)
+        await cache.put("b", b)
+        # 读取 a 后, b 成为最久未使用的图片
+        assert await cache.get("a") == a
+        await cache.put("c", c)
+        return [await cache.get(url) for url in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [a, None, c]
+    assert len(list((tmp_path / "pics").iterdir())) == 2
+    assert cache.size == 800 * KB
+    assert set(cache.digests) == set(cache.files)
+
+
+def test_concurrent_uploads_once(monkeypatch):
+    class FakeBot:
+        calls = 0
+
+        async def upload_file(self, file: bytes):
+            FakeBot.calls += 1
+            await asyncio.sleep(0.01)
+            return f"input-{len(file)}"
+
+    monkeypatch.setattr(bot_module, "bot", FakeBot())
+    monkeypatch.setattr(bot_module, "UPLOADED_FILES", {})
+    monkeypatch.setattr(bot_module, "UPLOADING", {})
+
+    async def run():
+        result = await bot_module.telegram_upload_file([b"image", b"image"])
+        # 有效期内再次发送使用之前上传的文件
+        result.append(await bot_module.upload_file(b"image"))
+        return result
+
+    assert asyncio.run(run()) == ["input-5"] * 3
+    assert FakeBot.calls == 1
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from config import config
+from src.utils.release_name import parse_release_name
+
+with open("fixtures/release_names.json", "rb") as f:
+    CASES = json.load(f)
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["title"][:40] for case in CASES])
+def test_fixture_titles(case):
+    result = parse_release_name(case["title"])
+    expected = case["expected"]
+    for key in ("group", "episode", "resolution"):
+        assert getattr(result, key) == expected[key]
+    # 置信度达到阈值时不再请求 chatgpt, 名称必须正确
+    if result.confidence >= config.release_name_min_confidence:
+        assert (result.cn, result.jp) == (expected["cn"], expected["jp"])
+
+
+@pytest.mark.parametrize(
+    "title",
+    [
+        "[织梦字幕组][尼尔：自动人形 Ver1.1a NieR Automata Ver1.1a][02集][1080P][AVC][简日双语]",
+        "[Group] 某番剧 v2.0 - 03 [1080p]",
+        "葬送的芙莉莲 全集 BDRip",
+        "[Sakurato] Ore dake Level Up na Ken [01-12 修正合集][HEVC-10bit 1080p AAC]",
+    ],
+)
+def test_low_confidence(title):
+    result = parse_release_name(title)
+    assert result.confidence < config.release_name_min_confidence
+
+
+def test_standard_title():
+    result = parse_release_name(
+        "[Lilith-Raws] AI 电子基因 / AI no Idenshi - 03v2 [Baha][WebDL 1080p AVC AAC][CHT]"
+    )
+    assert result.group == "Lilith-Raws"
+    assert (result.cn, result.jp) == ("AI 电子基因", "AI no Idenshi")
+    assert (result.episode, result.version) == ("3", 2)
+    assert result.resolution == "1080p"
+    assert result.languages == ["CHT"]
+    assert result.confidence == 1.0
+
+
+def test_bracket_title_and_languages():
+    result = parse_release_name(
+        "【喵萌奶茶屋】★04月新番★[夏日重现 / Summer Time Rendering][11][1080p][简日双语]"
+    )
+    assert result.group == "喵萌奶茶屋"
+    assert (result.cn, result.jp) == ("夏日重现", "Summer Time Rendering")
+    assert result.episode == "11"
+    assert result.languages == ["CHS", "JP"]
+
+
+def test_decimal_episode():
+    result = parse_release_name("[ANi] 某番剧 - 12.5 [1080P][Baha][WEB-DL][AAC AVC][CHT]")
+    assert result.episode == "12.5"
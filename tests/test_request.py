@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from config import config
+from src.utils import request
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """
+    httpx MockTransport, 记录请求次数, release 设置前响应一直挂起
+    If-None-Match 与 ETag 相同时返回 304
+    """
+
+    class Server:
+        calls = 0
+        release = None
+
+    async def handler(req: httpx.Request) -> httpx.Response:
+        Server.calls += 1
+        await Server.release.wait()
+        if req.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=b"feed", headers={"ETag": '"v1"'})
+
+    async def setup():
+        Server.release = asyncio.Event()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setitem(request.CLIENTS, None, client)
+
+    Server.setup = setup
+    monkeypatch.setattr(request, "RESPONSE_CACHE", {})
+    monkeypatch.setattr(request, "IN_FLIGHT", {})
+    monkeypatch.setattr(config, "http_cache_ttl", 0)
+    return Server
+
+
+def test_concurrent_requests_fetch_once(server):
+    async def run():
+        await server.setup()
+        tasks = [
+            asyncio.create_task(request.get("https://example.com/rss", cache=True))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0.01)
+        server.release.set()
+        return await asyncio.gather(*tasks)
+
+    responses = asyncio.run(run())
+    assert server.calls == 1
+    assert [r.content for r in responses] == [b"feed", b"feed"]
+    assert responses[0] is not responses[1]
+
+
+def test_cancel_one_caller(server):
+    async def run():
+        await server.setup()
+        first = asyncio.create_task(request.get("https://example.com/rss", cache=True))
+        second = asyncio.create_task(request.get("https://example.com/rss", cache=True))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        server.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()).content == b"feed"
+    assert server.calls == 1
+
+
+def test_conditional_headers_are_not_shared(server):
+    async def run():
+        await server.setup()
+        plain = asyncio.create_task(request.get("https://example.com/rss", cache=True))
+        conditional = asyncio.create_task(
+            request.get(
+                "https://example.com/rss",
+                headers={"If-None-Match": '"v1"'},
+                cache=True,
+            )
+        )
+        await asyncio.sleep(0.01)
+        server.release.set()
+        return await plain, await conditional
+
+    plain, conditional = asyncio.run(run())
+    assert server.calls == 2
+    assert plain.status_code == 200
+    assert conditional.status_code == 304
+
+
+def test_cache_ttl(server, monkeypatch):
+    monkeypatch.setattr(config, "http_cache_ttl", 60)
+
+    async def run():
+        await server.setup()
+        server.release.set()
+        await request.get("https://example.com/rss", cache=True)
+        await request.get("https://example.com/rss", cache=True)
+        assert server.calls == 1
+        # 缓存过期
+        for key, (_, response) in request.RESPONSE_CACHE.items():
+            request.RESPONSE_CACHE[key] = (time.monotonic() - 1, response)
+        await request.get("https://example.com/rss", cache=True)
+        assert server.calls == 2
+        assert len(request.RESPONSE_CACHE) == 1
+
+    asyncio.run(run())
+
+
+def test_downloads_are_not_cached(server, monkeypatch):
+    monkeypatch.setattr(config, "http_cache_ttl", 60)
+
+    async def run():
+        await server.setup()
+        server.release.set()
+        await request.get("https://example.com/a.torrent")
+        await request.get("https://example.com/a.torrent")
+
+    asyncio.run(run())
+    assert server.calls == 2
+    assert not request.RESPONSE_CACHE
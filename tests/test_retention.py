@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from src.database.backend import DAY_MS, JsonADataStorage, SqliteADataStorage
+from src.models import RetentionPolicy
+from src.utils import get_timestamp
+
+
+def records(count: int):
+    now = get_timestamp()
+    return [
+        {
+            "id": f"id-{i}",
+            "__type__": "AData",
+            "title": str(i),
+            "push_time": now - i * DAY_MS,
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "json":
+        return JsonADataStorage(str(tmp_path))
+    return SqliteADataStorage(str(tmp_path / "adata.db"), str(tmp_path))
+
+
+def test_max_days_keeps_ids(storage):
+    async def run():
+        await storage.save("rss", records(30))
+        await storage.compact("rss", RetentionPolicy(max_days=10))
+        ids = await storage.load_ids("rss")
+        loaded = await storage.load("rss")
+        await storage.close()
+        return ids, loaded
+
+    ids, loaded = asyncio.run(run())
+    # 订阅源仍可能返回旧条目, id 不能删除
+    assert sorted(ids) == sorted(f"id-{i}" for i in range(30))
+    assert sorted(r["id"] for r in loaded) == sorted(f"id-{i}" for i in range(10))
+
+
+def test_max_days_prunes_ids_not_fetched(storage):
+    async def run():
+        await storage.save("rss", records(30))
+        fetched = {f"id-{i}" for i in range(15)}
+        await storage.compact("rss", RetentionPolicy(max_days=10), fetched)
+        ids = await storage.load_ids("rss")
+        await storage.close()
+        return ids
+
+    # 超过 10 天但订阅源仍在返回的 id-10 ~ id-14 保留
+    assert sorted(asyncio.run(run())) == sorted(f"id-{i}" for i in range(15))
+
+
+def test_ids_stop_growing(storage):
+    async def run():
+        counts = []
+        # 订阅源每天新增一条, 只返回最近 5 条, 每天压缩一次
+        for day in range(60):
+            now = get_timestamp() - (60 - day) * DAY_MS
+            await storage.save(
+                "rss",
+                [{"id": f"id-{day}", "__type__": "AData", "push_time": now}],
+            )
+            fetched = {f"id-{i}" for i in range(max(day - 4, 0), day + 1)}
+            await storage.compact("rss", RetentionPolicy(max_days=10), fetched)
+            counts.append(len(await storage.load_ids("rss")))
+        await storage.close()
+        return counts
+
+    counts = asyncio.run(run())
+    assert max(counts[20:]) <= 11
+
+
+def test_max_items_keeps_ids(storage):
+    async def run():
+        await storage.save("rss", records(30))
+        await storage.compact("rss", RetentionPolicy(max_items=5))
+        ids = await storage.load_ids("rss")
+        loaded = await storage.load("rss")
+        await storage.close()
+        return ids, loaded
+
+    ids, loaded = asyncio.run(run())
+    assert len(ids) == 30
+    assert sorted(r["id"] for r in loaded) == sorted(f"id-{i}" for i in range(5))
+
+
+def test_corrupt_json_is_moved_aside(tmp_path):
+    async def run():
+        storage = JsonADataStorage(str(tmp_path))
+        (tmp_path / "test.json").write_text("[{broken", encoding="utf-8")
+        assert await storage.load("test") == []
+        await storage.save("test", records(1))
+        return await storage.load("test")
+
+    assert len(asyncio.run(run())) == 1
+    corrupt = list(tmp_path.glob("test.json.corrupt.*"))
+    assert len(corrupt) == 1
+    assert corrupt[0].read_text(encoding="utf-8") == "[{broken"
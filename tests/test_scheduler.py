@@ -0,0 +1,43 @@
+import datetime
+
+import pytest
+
+from config import config
+from src.models import Subscription
+from src.spider import create_spider
+from src.subscription import scheduler
+
+
+@pytest.fixture
+def subscription():
+    spider = create_spider(
+        {
+            "name": "RssSpider",
+            "support_actions": [],
+            "dynamic_config": {"url": "https://example.com/rss"},
+        }
+    )
+    sub = Subscription(
+        name="test_scheduler", cron="0 */5 * * * *", spider=spider, actions=[]
+    )
+    yield sub
+    scheduler.remove_job(sub)
+
+
+def first_run(subscription: Subscription) -> float:
+    job = scheduler.scheduler.get_job(subscription.name)
+    delay = job.next_run_time.replace(tzinfo=None) - datetime.datetime.now()
+    return delay.total_seconds()
+
+
+def test_added_job_runs_without_spread(subscription, monkeypatch):
+    monkeypatch.setattr(config, "fetch_start_spread", 3600)
+    scheduler.add_job(subscription)
+    assert first_run(subscription) <= 1
+
+
+def test_startup_jobs_are_spread(subscription, monkeypatch):
+    monkeypatch.setattr(config, "fetch_start_spread", 3600)
+    monkeypatch.setattr(scheduler.random, "uniform", lambda a, b: b)
+    scheduler.add_jobs([subscription])
+    assert first_run(subscription) > 3000
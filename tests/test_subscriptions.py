@@ -0,0 +1,79 @@
+import asyncio
+import json
+import sys
+
+import pytest
+
+from src.models import Subscription
+from src.spider import create_spider
+from src.subscription import scheduler
+
+database = sys.modules["src.database"]
+
+VALID = {
+    "name": "valid",
+    "cron": "0 */5 * * * *",
+    "spider": {
+        "name": "RssSpider",
+        "support_actions": [],
+        "dynamic_config": {"url": "https://example.com/rss"},
+    },
+    "actions": [],
+}
+UNKNOWN = {
+    "name": "unknown",
+    "cron": "0 */5 * * * *",
+    "spider": {"name": "RemovedSpider", "dynamic_config": {"url": "x"}},
+    "actions": [],
+    "extra": 1,
+}
+
+
+class FakeOutbox:
+    async def drop_subscription(self, name: str) -> None:
+        pass
+
+
+@pytest.fixture
+def config_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "outbox", FakeOutbox())
+    monkeypatch.setattr(database, "subscription_path", str(tmp_path))
+    monkeypatch.setattr(database, "_subscriptions_loaded", False)
+    monkeypatch.setattr(database, "SUBSCRIPTIONS", {})
+    (tmp_path / "config.json").write_text(
+        json.dumps([VALID, UNKNOWN]), encoding="utf-8"
+    )
+    yield tmp_path / "config.json"
+    database.UNLOADED_SUBSCRIPTIONS.clear()
+
+
+def new_subscription() -> Subscription:
+    return Subscription(
+        name="new",
+        cron="0 */5 * * * *",
+        spider=create_spider(
+            {
+                "name": "RssSpider",
+                "support_actions": [],
+                "dynamic_config": {"url": "https://example.com/new"},
+            }
+        ),
+        actions=[],
+    )
+
+
+def test_unloaded_subscription_is_kept(config_path):
+    async def run():
+        loaded = await database.load_subscriptions()
+        await database.add_subscription(new_subscription())
+        await database.delete_subscription(loaded[0])
+        return loaded
+
+    loaded = asyncio.run(run())
+    scheduler.remove_job(new_subscription())
+    assert [subscription.name for subscription in loaded] == ["valid"]
+    saved = json.loads(config_path.read_text(encoding="utf-8"))
+    assert [data["name"] for data in saved] == ["new", "unknown"]
+    assert saved[1] == UNKNOWN
+    backup = json.loads((config_path.parent / "config.json.bak").read_text("utf-8"))
+    assert UNKNOWN in backup